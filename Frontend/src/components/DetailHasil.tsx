@@ -1,5 +1,5 @@
-import React from "react";
-import { useLocation, useNavigate } from "react-router-dom";
+import React, { useState, useEffect } from "react";
+import { useLocation, useNavigate, useParams } from "react-router-dom";
 import {
   ArrowLeft,
   MapPin,
@@ -13,11 +13,37 @@ import {
 import Navbar from "../components/Navbar";
 import Footer from "../components/Footer";
 
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
+
 const DetailHasil: React.FC = () => {
   const location = useLocation();
   const navigate = useNavigate();
-
-  const data = location.state;
+  const { id } = useParams();
+
+  // Hasil pencarian hanya membawa snippet, dokumen lengkap diambil di sini
+  const [detail, setDetail] = useState<any>(null);
+  const [isLoading, setIsLoading] = useState<boolean>(true);
+
+  useEffect(() => {
+    if (!id) return;
+    setIsLoading(true);
+    fetch(`${API_BASE_URL}/documents/${encodeURIComponent(id)}`)
+      .then((response) => (response.ok ? response.json() : null))
+      .then((doc) => setDetail(doc))
+      .catch((error) => console.error("Error fetching document:", error))
+      .finally(() => setIsLoading(false));
+  }, [id]);
+
+  const data =
+    location.state || detail ? { ...location.state, ...detail } : null;
+
+  if (!data && isLoading) {
+    return (
+      <div className="min-h-screen bg-swarna-primary flex items-center justify-center text-swarna-light">
+        <p className="text-swarna-light/60">Memuat...</p>
+      </div>
+    );
+  }
 
   if (!data) {
     return (
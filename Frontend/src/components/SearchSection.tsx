@@ -27,6 +27,24 @@ const algoTabs = [
 
 const ITEMS_PER_PAGE = 4;
 
+// Snippet dari API + offset highlight [start, end) → teks dengan <mark>
+const renderSnippet = (text: string, highlights?: number[][]) => {
+  if (!highlights || highlights.length === 0) return text;
+  const parts: React.ReactNode[] = [];
+  let last = 0;
+  highlights.forEach(([start, end], i) => {
+    if (start > last) parts.push(text.slice(last, start));
+    parts.push(
+      <mark key={i} className="bg-swarna-gold/30 text-inherit rounded px-0.5">
+        {text.slice(start, end)}
+      </mark>
+    );
+    last = end;
+  });
+  parts.push(text.slice(last));
+  return parts;
+};
+
 // --- TIPE DATA EVALUASI ---
 interface EvalMetrics {
   precision: number;
@@ -81,6 +99,18 @@ const SearchSection: React.FC = () => {
     return page ? parseInt(page) : 0;
   });
 
+  // Pagination dari server: total hasil + cursor untuk tiap halaman (halaman 0 = null)
+  const [total, setTotal] = useState<number>(() => {
+    if (!shouldRestore) return 0;
+    return parseInt(sessionStorage.getItem("swarna_total") || "0");
+  });
+
+  const [cursors, setCursors] = useState<(string | null)[]>(() => {
+    if (!shouldRestore) return [null];
+    const saved = sessionStorage.getItem("swarna_cursors");
+    return saved ? JSON.parse(saved) : [null];
+  });
+
   const [isSearching, setIsSearching] = useState<boolean>(false);
 
   // --- STATE EVALUASI ---
@@ -99,14 +129,20 @@ const SearchSection: React.FC = () => {
     sessionStorage.setItem("swarna_hasSearched", String(hasSearched));
     sessionStorage.setItem("swarna_tab", activeAlgoTab);
     sessionStorage.setItem("swarna_page", String(pageIndex));
-  }, [query, results, hasSearched, activeAlgoTab, pageIndex]);
+    sessionStorage.setItem("swarna_total", String(total));
+    sessionStorage.setItem("swarna_cursors", JSON.stringify(cursors));
+  }, [query, results, hasSearched, activeAlgoTab, pageIndex, total, cursors]);
 
   // --- CORE SEARCH LOGIC (DIPISAH SUPAYA BISA DIPANGGIL TAB) ---
-  const executeSearch = async (searchQuery: string, algoMode: string) => {
+  const executeSearch = async (
+    searchQuery: string,
+    algoMode: string,
+    page: number = 0,
+    cursor: string | null = null
+  ) => {
     if (!searchQuery) return;
 
     setIsSearching(true);
-    setPageIndex(0);
 
     try {
       let modeParam = algoMode;
@@ -115,7 +151,9 @@ const SearchSection: React.FC = () => {
       const response = await fetch(
         `${API_BASE_URL}/search?q=${encodeURIComponent(
           searchQuery
-        )}&mode=${modeParam}`
+        )}&mode=${modeParam}&limit=${ITEMS_PER_PAGE}${
+          cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""
+        }`
       );
 
       const data = await response.json();
@@ -123,7 +161,8 @@ const SearchSection: React.FC = () => {
       const mappedResults = data.results.map((item: any) => ({
         id: item.document.no,
         judul: item.document.judul,
-        deskripsi: item.document.deskripsi,
+        snippet: item.snippet?.text,
+        highlights: item.snippet?.highlights,
         gambar: item.document.gambar,
         kategori: item.document.kategori,
         asal_daerah: item.document.asal_daerah,
@@ -134,6 +173,13 @@ const SearchSection: React.FC = () => {
       }));
 
       setResults(mappedResults);
+      setTotal(data.total);
+      setPageIndex(page);
+      setCursors((prev) => {
+        const next = page === 0 ? [null] : prev.slice(0, page + 1);
+        next[page + 1] = data.next_cursor;
+        return next;
+      });
       setHasSearched(true);
     } catch (error) {
       console.error("Error fetching:", error);
@@ -147,7 +193,10 @@ const SearchSection: React.FC = () => {
             .toLowerCase()
             .includes(searchQuery.toLowerCase())
       );
-      setResults(allMatches);
+      setResults(allMatches.slice(0, ITEMS_PER_PAGE));
+      setTotal(allMatches.length);
+      setPageIndex(0);
+      setCursors([null]);
       setHasSearched(true);
     } finally {
       setIsSearching(false);
@@ -186,19 +235,18 @@ const SearchSection: React.FC = () => {
     }
   };
 
-  // Logic Pagination
-  const totalPages = Math.ceil(results.length / ITEMS_PER_PAGE);
-  const currentResults = results.slice(
-    pageIndex * ITEMS_PER_PAGE,
-    (pageIndex + 1) * ITEMS_PER_PAGE
-  );
+  // Logic Pagination (halaman diambil dari server lewat cursor)
+  const totalPages = Math.max(1, Math.ceil(total / ITEMS_PER_PAGE));
+  const currentResults = results;
 
   const nextPage = () => {
-    if (pageIndex < totalPages - 1) setPageIndex((prev) => prev + 1);
+    const cursor = cursors[pageIndex + 1];
+    if (cursor) executeSearch(query, activeAlgoTab, pageIndex + 1, cursor);
   };
 
   const prevPage = () => {
-    if (pageIndex > 0) setPageIndex((prev) => prev - 1);
+    if (pageIndex > 0)
+      executeSearch(query, activeAlgoTab, pageIndex - 1, cursors[pageIndex - 1]);
   };
 
   const handleCardClick = (item: SearchResult) => {
@@ -333,7 +381,7 @@ const SearchSection: React.FC = () => {
                   <p className="text-swarna-light/60 text-sm">
                     Menampilkan{" "}
                     <span className="text-swarna-gold font-bold">
-                      {results.length}
+                      {total}
                     </span>{" "}
                     hasil
                   </p>
@@ -351,7 +399,7 @@ const SearchSection: React.FC = () => {
                     </button>
                     <button
                       onClick={nextPage}
-                      disabled={pageIndex === totalPages - 1}
+                      disabled={!cursors[pageIndex + 1]}
                       className="p-2 rounded-full bg-swarna-light/10 hover:bg-swarna-gold hover:text-swarna-dark text-swarna-light disabled:opacity-30 disabled:cursor-not-allowed transition-all"
                     >
                       <ChevronRight className="w-5 h-5" />
@@ -386,7 +434,8 @@ const SearchSection: React.FC = () => {
                           {item.judul || item.title}
                         </h3>
                         <p className="text-sm text-gray-600 mb-4 line-clamp-3 leading-relaxed flex-grow">
-                          {item.deskripsi || item.snippet}
+                          {item.deskripsi ||
+                            renderSnippet(item.snippet || "", item.highlights)}
                         </p>
 
                         <div className="bg-swarna-primary/5 rounded-xl p-3 space-y-2 mt-auto">
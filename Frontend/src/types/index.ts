@@ -8,6 +8,7 @@ export interface SearchResult {
   judul?: string;
   
   snippet?: string;
+  highlights?: number[][]; // [start, end) di dalam snippet
   deskripsi?: string;
   
   image?: string;
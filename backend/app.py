@@ -1,39 +1,77 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+from typing import List, Optional
+import os
+import heapq
+import base64
+import hashlib
+import secrets
+import asyncio
+import multiprocessing
+import functools
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from fastapi.middleware.cors import CORSMiddleware
-import json
-import numpy as np
-from scipy import sparse
-import pickle
-from pathlib import Path
 from evaluation import evaluate
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from search_engine import preprocess_query
-
-# Paths
-BASE_DIR = Path(__file__).resolve().parent
-DATA_CLEAN = BASE_DIR / "data_clean"
-MODELS_DIR = BASE_DIR / "models"
-
-# Load docs
-DOCS = json.load(open(DATA_CLEAN / "preprocessed_dataset.json", encoding="utf-8"))
-
-# Load TF-IDF vectorizer & matrix
-try:
-    VECTORIZER = pickle.load(open(MODELS_DIR / "tfidf_vectorizer.pkl", "rb"))
-except Exception:
-    # fallback: build a vectorizer from saved vocabulary if .pkl missing
-    vocab_path = MODELS_DIR / "tfidf_vocab.json"
-    if vocab_path.exists():
-        vocab = json.load(open(vocab_path, encoding="utf-8"))
-        # sklearn expects vocabulary mapping token->feature_index
-        VECTORIZER = TfidfVectorizer(vocabulary=vocab)
-    else:
-        raise
+from search_engine import preprocess_query, correct_query, ResultCache, cache_info, search_bm25, suggest, snippet, facet_mask, facet_counts, score_docs, score_docs_many, phrase_proximity, PHRASE_BOOST, documents, doc_index, doc_nos, warm_up, snapshot
+
+# Docs, vectorizer and indexes live in search_engine (loaded here together with the speller,
+# facets, autocomplete and snippet offsets, shared with /evaluate, reloaded by the engine
+# when the index is rebuilt, so always read through documents())
+warm_up()
+
+# Fields of a document sent with every search result by default (fields= picks others);
+# the text itself is replaced by a snippet
+RESULT_FIELDS = ("no", "judul", "kategori", "asal_daerah", "link", "gambar", "snippet")
+# Phrase-proximity boost per ranked score (the engine's weights, these scores are on its
+# 0-1 scale), 1 = every query bigram occurs as an exact phrase
+PHRASE_BOOST_WEIGHT = {"tfidf_score": PHRASE_BOOST["tfidf"], "jaccard_score": PHRASE_BOOST["jaccard"],
+                       "combined_score": PHRASE_BOOST["hybrid"]}
+
+# Cache of ranked search results, keyed on the preprocessed query
+SEARCH_CACHE = ResultCache()
+# Ranked id lists behind the pagination cursors, short-lived
+RANKING_TTL = 300
+RANKING_CACHE = ResultCache(maxsize=256, ttl=RANKING_TTL)
+
+# Scoring runs on its own executor, never on the event loop or FastAPI's default pool;
+# at most SEARCH_WORKERS running + SEARCH_QUEUE waiting, beyond that → 503 + Retry-After.
+# NumPy stages release the GIL, so threads by default; EVAL_PROCESSES > 0 sends /evaluate
+# (three full rankings, mostly Python) to worker processes instead. Those are started by a
+# forkserver (spawn where there is none), never forked from this process: a fork taken while
+# a search thread holds the engine's load lock or a cache lock would start with it held.
+SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS", 4))
+SEARCH_QUEUE = int(os.environ.get("SEARCH_QUEUE", 32))
+EVAL_PROCESSES = int(os.environ.get("EVAL_PROCESSES", 0))
+RETRY_AFTER = 1  # seconds
+# (pid, search executor, evaluate executor): created on first use in every process, never
+# at import, so prefork workers (serve) don't share the queues and pipes of one pool
+_executors = None
+_in_flight = 0  # only touched on the event loop thread
+
+def _get_executors():
+    global _executors
+    if _executors is None or _executors[0] != os.getpid():
+        search = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+        evaluation = search
+        if EVAL_PROCESSES > 0:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            # every process loads the engine once at start (the index arrays are mmap'd, so
+            # the page cache is still shared)
+            evaluation = ProcessPoolExecutor(max_workers=EVAL_PROCESSES, initializer=warm_up,
+                                             mp_context=multiprocessing.get_context(method))
+        _executors = (os.getpid(), search, evaluation)
+    return _executors
 
-X_TFIDF = sparse.load_npz(MODELS_DIR / "tfidf_matrix.npz")
+@contextlib.asynccontextmanager
+async def _lifespan(app):
+    yield
+    # waits for running tasks, so the /evaluate processes exit with their worker
+    if _executors is not None and _executors[0] == os.getpid():
+        for executor in set(_executors[1:]):
+            executor.shutdown(wait=True, cancel_futures=True)
 
-app = FastAPI()
+app = FastAPI(lifespan=_lifespan)
 
 # CORS for frontend
 app.add_middleware(
@@ -44,88 +82,387 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- JACCARD ---
-def jaccard_similarity(q_tokens, d_tokens):
-    set_q = set(q_tokens)
-    set_d = set(d_tokens)
-    if not set_q or not set_d:
-        return 0
-    return len(set_q & set_d) / len(set_q | set_d)
-
-# --- HELPER: Check if document contains ALL query unigrams (AND logic, skip bigrams) ---
-def _doc_contains_all_tokens(doc_tokens, query_tokens):
-    """Check if doc_tokens contain ALL unigram tokens from query_tokens (AND matching).
-    Ignores bigrams since documents don't store them as separate tokens."""
-    if not query_tokens:
-        return True
-    doc_set = set(doc_tokens)
-    # Only check unigrams (tokens without space), skip bigrams
-    unigrams = [t for t in query_tokens if ' ' not in t]
-    if not unigrams:
-        return True
-    return all(token in doc_set for token in unigrams)
-
-# --- FULL SEARCH FUNCTION (TF-IDF + Jaccard + Combined with AND logic) ---
-def search_full(query, mode="combined", top_k=None):
+def _doc(no):
+    i = doc_index(no)
+    return None if i is None else documents()[i]
+
+# --- RESULT DOCUMENT: projected fields + query-dependent snippet instead of the full article ---
+def _parse_fields(fields):
+    """fields= value ("judul,deskripsi,...") → tuple of field names, "no" always included."""
+    if not fields:
+        return RESULT_FIELDS
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    # every stored field (index data like tokens is not in the doc store)
+    stored = documents().fields
+    unknown = [f for f in names if f not in stored and f != "snippet"]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    return ("no",) + tuple(f for f in names if f != "no")
+
+def _format_results(ranked, q_tokens, fields=RESULT_FIELDS):
+    results = []
+    for entry in ranked:
+        r = dict(entry)
+        no = r.pop("no")
+        doc = _doc(no)
+        r["document"] = {f: doc[f] for f in fields if f in doc}
+        if "snippet" in fields:
+            r["snippet"] = snippet(no, q_tokens)
+        results.append(r)
+    return results
+
+# --- RANKING (TF-IDF + Jaccard + Combined with AND logic) → [{"no", scores...}, ...] ---
+def rank_full(query, mode="combined", top_k=None, kategori=None, asal_daerah=None, phrase=False):
 
     # Use the same preprocessing as the search engine (stopwords, stemmer, bigrams)
     q_clean, q_tokens = preprocess_query(query)
 
     # Filter out empty queries
     if not q_tokens:
-        return []
+        return q_tokens, []
 
-    # TF-IDF vector untuk query (use cosine similarity for comparable scores)
-    q_vec = VECTORIZER.transform([q_clean])
-    tfidf_scores = cosine_similarity(q_vec, X_TFIDF).flatten()
+    # BM25 is ranked by the search engine over its inverted index (no AND filter)
+    if mode == "bm25":
+        return q_tokens, [
+            {"no": r["no"], "bm25_score": r["score_bm25"]}
+            for r in search_bm25(query, top_k, kategori=kategori, asal_daerah=asal_daerah, phrase=phrase)
+        ]
 
-    results = []
-    for i, doc in enumerate(DOCS):
-        d_tokens = doc["tokens"]  # dari preprocessed_dataset.json
+    cache_key = (mode, q_clean, top_k, kategori, asal_daerah, phrase)
+    hit, cached = SEARCH_CACHE.get(cache_key)
+    if hit:
+        return q_tokens, cached
 
-        # --- AND LOGIC: Only include docs that contain ALL query tokens ---
-        if not _doc_contains_all_tokens(d_tokens, q_tokens):
-            continue
+    # --- AND LOGIC: only docs that contain ALL query unigrams (inverted index), with
+    # phrase=True also every query bigram as adjacent tokens (positional index), within
+    # the facet filters (bitmap intersection), with their TF-IDF cosine and Jaccard
+    mask = facet_mask(kategori=kategori, asal_daerah=asal_daerah)
+    rows, tfidf_scores, jaccard_scores = score_docs(q_clean, q_tokens, mask, phrase)
+    results = _rank_scored(mode, q_tokens, rows, tfidf_scores, jaccard_scores, top_k)
+
+    SEARCH_CACHE.put(cache_key, results)
+    return q_tokens, results
 
-        jaccard_score = jaccard_similarity(q_tokens, d_tokens)
-        tfidf_score = float(tfidf_scores[i])
+# --- THRESHOLD + SORT of the matched docs' scores (shared by rank_full and rank_many) ---
+def _rank_scored(mode, q_tokens, rows, tfidf_scores, jaccard_scores, top_k):
+    results = []
+    kept = []
+    for n, no in enumerate(doc_nos(rows)):
+        jaccard_score = float(jaccard_scores[n])
+        tfidf_score = float(tfidf_scores[n])
 
         # combined score
         combined_score = 0.5 * tfidf_score + 0.5 * jaccard_score
 
         # Apply minimum threshold to filter out low-relevance docs
         if combined_score >= 0.05:
+            kept.append(rows[n])
             results.append({
-                "document": doc,
+                "no": no,
                 "tfidf_score": tfidf_score,
                 "jaccard_score": jaccard_score,
-                "combined_score": combined_score
+                "combined_score": combined_score,
+                "phrase_boost": 0.0
             })
 
     # Sorting berdasarkan mode
     if mode == "tfidf":
-        results.sort(key=lambda x: x["tfidf_score"], reverse=True)
+        field = "tfidf_score"
     elif mode == "jaccard":
-        results.sort(key=lambda x: x["jaccard_score"], reverse=True)
+        field = "jaccard_score"
     else:  # default combined
-        results.sort(key=lambda x: x["combined_score"], reverse=True)
+        field = "combined_score"
+    # PHRASE BOOSTING after the threshold: reorders, never adds or drops. Returned as its own
+    # field and added to the ranked score only in the sort key, the scores stay unboosted
+    if results and any(" " in t for t in q_tokens):
+        for r, proximity in zip(results, phrase_proximity(q_tokens, kept).tolist()):
+            r["phrase_boost"] = PHRASE_BOOST_WEIGHT[field] * proximity
+    key = lambda x: x[field] + x["phrase_boost"]
 
-    # Apply top_k limit only if specified
+    # Apply top_k limit only if specified (bounded heap, ties keep document order)
     if top_k is not None:
-        return results[:top_k]
+        results = heapq.nlargest(top_k, results, key=key)
+    else:
+        results.sort(key=key, reverse=True)
     return results
 
+# --- BATCH RANKING: rank_full for many queries, TF-IDF scored in one matrix product ---
+def rank_many(queries, mode="combined", top_k=None, kategori=None, asal_daerah=None, phrase=False):
+    """[(q_tokens, ranked), ...] per query, identical to rank_full; the queries that are
+    not cached are scored together (score_docs_many)."""
+    out = [None] * len(queries)
+    pending = []
+    for n, query in enumerate(queries):
+        q_clean, q_tokens = preprocess_query(query)
+        if mode == "bm25" or not q_tokens:
+            out[n] = rank_full(query, mode, top_k, kategori, asal_daerah, phrase)
+            continue
+        cache_key = (mode, q_clean, top_k, kategori, asal_daerah, phrase)
+        hit, cached = SEARCH_CACHE.get(cache_key)
+        if hit:
+            out[n] = (q_tokens, cached)
+        else:
+            pending.append((n, q_clean, q_tokens, cache_key))
+
+    if pending:
+        mask = facet_mask(kategori=kategori, asal_daerah=asal_daerah)
+        scored = score_docs_many([p[1] for p in pending], [p[2] for p in pending], mask, phrase)
+        for (n, _, q_tokens, cache_key), (rows, tfidf_scores, jaccard_scores) in zip(pending, scored):
+            results = _rank_scored(mode, q_tokens, rows, tfidf_scores, jaccard_scores, top_k)
+            SEARCH_CACHE.put(cache_key, results)
+            out[n] = (q_tokens, results)
+    return out
+
+# --- FULL SEARCH FUNCTION: every ranked result, with snippets ---
+def search_full(query, mode="combined", top_k=None, kategori=None, asal_daerah=None,
+                fields=RESULT_FIELDS, phrase=False):
+    q_tokens, ranked = rank_full(query, mode, top_k, kategori, asal_daerah, phrase)
+    return _format_results(ranked, q_tokens, fields)
+
+# --- PAGINATION: cursor = opaque "<ranking token>:<offset>:<params hash>" ---
+def _params_hash(params):
+    return hashlib.blake2b(repr(params).encode(), digest_size=8).hexdigest()
+
+def _encode_cursor(token, offset, params):
+    return base64.urlsafe_b64encode(f"{token}:{offset}:{_params_hash(params)}".encode()).decode()
+
+def _decode_cursor(cursor, params):
+    try:
+        token, offset, digest = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        offset = int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("invalid cursor")
+    if offset < 0:
+        raise ValueError("invalid cursor")
+    if digest != _params_hash(params):
+        raise ValueError("cursor does not belong to this query")
+    return token, offset
+
+def search_page(query, mode="combined", limit=None, cursor=None, top_k=None,
+                kategori=None, asal_daerah=None, fields=RESULT_FIELDS, phrase=False):
+    """One page of results. The first page ranks the query and keeps the ranked id list
+    under a fresh token; the cursors of later pages point into that list, so paging never
+    rescores and the order stays stable. A cursor carries a hash of the query parameters
+    of the page that returned it and is rejected with any others.
+    The list lives in the worker that ranked it: a page served by another worker (serve
+    forks several) or after the token expired re-ranks the query and keeps that list
+    under the same token. Ranking is deterministic, so the pages line up unless the index
+    was rebuilt in between."""
+    params = (query, mode, top_k, kategori, asal_daerah, phrase)
+    token, offset = _decode_cursor(cursor, params) if cursor else (None, 0)
+    hit, cached = RANKING_CACHE.get(token) if token else (False, None)
+    if hit:
+        cached_params, q_tokens, ranked = cached
+        if cached_params != params:
+            raise ValueError("cursor does not belong to this query")
+    else:
+        q_tokens, ranked = rank_full(query, mode, top_k, kategori, asal_daerah, phrase)
+        if limit is not None:
+            token = token or secrets.token_urlsafe(8)
+            RANKING_CACHE.put(token, (params, q_tokens, ranked))
+
+    end = len(ranked) if limit is None else offset + limit
+    return {
+        "total": len(ranked),
+        "next_cursor": _encode_cursor(token, end, params) if end < len(ranked) else None,
+        # facet counts over every ranked result, not only this page
+        "facets": facet_counts(r["no"] for r in ranked),
+        "results": _format_results(ranked[offset:end], q_tokens, fields),
+    }
+
+# --- BATCH SEARCH ---
+BATCH_MODES = ("combined", "tfidf", "jaccard", "bm25")
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    mode: str = "combined"
+    top_k: Optional[int] = None
+    kategori: Optional[str] = None
+    asal_daerah: Optional[str] = None
+    phrase: bool = False
+    fields: Optional[str] = None
+
+# --- OFFLOADING: run fn on an executor, or 503 when the bounded queue is full ---
+async def _offload(fn, *args, evaluation=False):
+    global _in_flight
+    if _in_flight >= SEARCH_WORKERS + SEARCH_QUEUE:
+        raise HTTPException(status_code=503, detail="search queue full",
+                            headers={"Retry-After": str(RETRY_AFTER)})
+    _, search, evaluate_pool = _get_executors()
+    executor = evaluate_pool if evaluation else search
+    _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args))
+    finally:
+        _in_flight -= 1
+
 # --- ROUTES ---
 @app.get("/")
-def home():
+async def home():
     return {"status": "OK", "message": "Search API running"}
 
 @app.get("/search")
-def search_api(q: str, mode: str = "combined", top_k: int | None = None):
-    results = search_full(q, mode, top_k)
-    return {"query": q, "mode": mode, "results": results}
+async def search_api(q: str, mode: str = "combined", top_k: int | None = None,
+                     kategori: str | None = None, asal_daerah: str | None = None,
+                     limit: int | None = None, cursor: str | None = None, fields: str | None = None,
+                     phrase: bool = False):
+    return await _offload(_search_response, q, mode, top_k, kategori, asal_daerah, limit, cursor,
+                          fields, phrase)
+
+def _search_response(q, mode, top_k, kategori, asal_daerah, limit, cursor, fields, phrase):
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    try:
+        # every engine call of the request reads one index version, even across a reload
+        with snapshot():
+            page = search_page(q, mode, limit, cursor, top_k, kategori, asal_daerah,
+                               _parse_fields(fields), phrase)
+            did_you_mean = correct_query(q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"query": q, "mode": mode, "did_you_mean": did_you_mean, **page}
+
+@app.get("/documents/{no}")
+def document_api(no: int):
+    with snapshot():
+        doc = _doc(no)
+        if doc is None:
+            raise HTTPException(status_code=404, detail="document not found")
+        return {f: doc[f] for f in documents().fields if f in doc}
+
+@app.get("/suggest")
+def suggest_api(prefix: str, limit: int = 10):
+    return {"prefix": prefix, "suggestions": suggest(prefix, limit)}
+
+@app.post("/search/batch")
+async def search_batch_api(req: BatchSearchRequest):
+    # the rankings of /search; "hybrid" (search_engine's name) is accepted for combined
+    mode = "combined" if req.mode == "hybrid" else req.mode
+    if mode not in BATCH_MODES:
+        raise HTTPException(status_code=400,
+                            detail=f"unknown mode {req.mode!r}, expected one of {list(BATCH_MODES)}")
+    try:
+        fields = _parse_fields(req.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await _offload(_batch_response, req.queries, mode, req.top_k, req.kategori,
+                          req.asal_daerah, req.phrase, fields)
+
+def _batch_response(queries, mode, top_k, kategori, asal_daerah, phrase, fields):
+    with snapshot():
+        ranked = rank_many(queries, mode, top_k, kategori, asal_daerah, phrase)
+        return {
+            "mode": mode,
+            "results": [
+                {"query": q, "total": len(r), "results": _format_results(r, q_tokens, fields)}
+                for q, (q_tokens, r) in zip(queries, ranked)
+            ],
+        }
+
+@app.get("/cache")
+def cache_api():
+    return {"search": SEARCH_CACHE.info(), "pages": RANKING_CACHE.info(), "engine": cache_info()}
 
 @app.get("/evaluate")
-def evaluate_api(q: str, top_k: int | None = None):
-    result = evaluate(q, top_k)
-    return result
\ No newline at end of file
+async def evaluate_api(q: str, top_k: int | None = None):
+    result = await _offload(evaluate, q, top_k, evaluation=True)
+    return result
+
+# --- PREFORK SERVING: load once, fork workers that share the index copy-on-write ---
+# A dead worker is replaced after RESPAWN_DELAY seconds, doubled for every worker already
+# replaced within the last RESPAWN_WINDOW seconds (at most RESPAWN_MAX_DELAY); after
+# RESPAWN_LIMIT replacements within the window (workers that keep crashing) serve gives up
+RESPAWN_DELAY = 0.5
+RESPAWN_MAX_DELAY = 5
+RESPAWN_WINDOW = 60
+RESPAWN_LIMIT = 10
+
+def serve(host="127.0.0.1", port=8000, workers=os.cpu_count() or 1):
+    """Load the whole engine in this process, then fork `workers` uvicorn servers on one
+    listening socket. gc.freeze moves the loaded objects out of the collector's reach, so
+    collections in the workers never write to (and copy) those shared pages. A worker
+    that dies is replaced, with a growing delay, and when they keep dying serve stops
+    them all and exits with status 1; SIGINT/SIGTERM stop them all."""
+    import gc
+    import signal
+    import socket
+    import sys
+    import time
+    import traceback
+    from collections import deque
+    import uvicorn
+
+    warm_up()
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    def spawn():
+        # signals blocked across the fork: a SIGTERM sent to a new worker before it has
+        # reset the handlers would otherwise run the parent's stop() in it
+        stop_signals = {signal.SIGINT, signal.SIGTERM}
+        signal.pthread_sigmask(signal.SIG_BLOCK, stop_signals)
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+            try:
+                uvicorn.Server(uvicorn.Config(app, log_level="info")).run(sockets=[sock])
+            except BaseException:
+                # never fall through into the parent's loop below
+                traceback.print_exc()
+                os._exit(1)
+            os._exit(0)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+        return pid
+
+    children = {spawn() for _ in range(workers)}
+    respawns = deque()  # monotonic times of the recent replacements
+    stopping = False
+    failed = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    print(f"Serving on http://{host}:{port} with {workers} workers")
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if stopping:
+            continue
+        now = time.monotonic()
+        while respawns and now - respawns[0] > RESPAWN_WINDOW:
+            respawns.popleft()
+        if len(respawns) >= RESPAWN_LIMIT:
+            print(f"workers keep dying ({len(respawns)} replaced within {RESPAWN_WINDOW}s), stopping",
+                  file=sys.stderr)
+            failed = True
+            stop(None, None)
+            continue
+        time.sleep(min(RESPAWN_MAX_DELAY, RESPAWN_DELAY * 2 ** len(respawns)))
+        if not stopping:  # (a signal may have arrived during the delay)
+            respawns.append(time.monotonic())
+            children.add(spawn())
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    # python app.py → prefork serving (WORKERS, HOST, PORT from the environment)
+    serve(os.environ.get("HOST", "127.0.0.1"), int(os.environ.get("PORT", 8000)),
+          int(os.environ.get("WORKERS", os.cpu_count() or 1)))
@@ -1,14 +1,13 @@
 import time
-import json
-import pathlib
 from typing import List, Optional
 
 # --- PENTING: Import logika dari search_engine agar sinkron ---
-# Kita gunakan fungsi _doc_contains_all_tokens agar cara menilai relevansinya
-# sama persis dengan cara search engine mencari data.
-from search_engine import search_tfidf, search_jaccard, search_hybrid, preprocess_query, _doc_contains_all_tokens
+# Kita gunakan match_docs (AND logic lewat inverted index) agar cara menilai
+# relevansinya sama persis dengan cara search engine mencari data, dan dokumen
+# yang sudah dimuat search engine dipakai bersama (tidak dimuat ulang).
+from search_engine import search_tfidf, search_jaccard, search_hybrid, preprocess_query, match_docs, doc_nos, snapshot
 
-def _determine_relevant_docs(query: str, docs):
+def _determine_relevant_docs(query: str):
     """
     Menentukan Ground Truth (Kunci Jawaban).
     Dokumen dianggap relevan jika mengandung SEMUA token query (AND Logic),
@@ -23,18 +22,9 @@ def _determine_relevant_docs(query: str, docs):
     if not q_tokens:
         return set()
 
-    relevant = set()
-    
-    # 2. Cek database
-    for doc in docs:
-        # Ambil token yang sudah ada di database
-        doc_tokens = doc.get("tokens", [])
-        
-        # Cek kesesuaian menggunakan logika yang sama dengan search engine
-        if _doc_contains_all_tokens(doc_tokens, q_tokens):
-            relevant.add(doc.get("no"))
-            
-    return relevant
+    # 2. Cek database: dokumen yang mengandung semua token query
+    rows, _ = match_docs(q_tokens)
+    return set(doc_nos(rows))
 
 def precision_recall_f1(relevant: set, retrieved: List[int]):
     retrieved_set = set(retrieved)
@@ -50,41 +40,41 @@ def precision_recall_f1(relevant: set, retrieved: List[int]):
     return precision, recall, f1
 
 def evaluate(query: str, top_k: Optional[int] = None):
-    # 1. Load Dataset
-    BASE = pathlib.Path(__file__).resolve().parent
-    DATA_CLEAN = BASE / "data_clean"
-    
+    # Kunci jawaban dan ketiga hasil search dihitung dari versi index yang sama
+    with snapshot():
+        return _evaluate(query, top_k)
+
+def _evaluate(query: str, top_k: Optional[int] = None):
+    # 1. Tentukan Kunci Jawaban (Ground Truth), dari data search engine
     try:
-        docs = json.load(open(DATA_CLEAN / "preprocessed_dataset.json", encoding="utf-8"))
+        relevant = _determine_relevant_docs(query)
     except Exception as e:
         return {"error": str(e)}
 
-    # 2. Tentukan Kunci Jawaban (Ground Truth)
-    relevant = _determine_relevant_docs(query, docs)
-
-    # 3. Jalankan 3 Algoritma Search
+    # 2. Jalankan 3 Algoritma Search
+    # (fungsi aslinya, tanpa result cache: yang diukur waktu algoritmanya, bukan lookup cache)
     t0 = time.time()
-    tfidf_res = search_tfidf(query, top_k)
+    tfidf_res = search_tfidf.__wrapped__(query, top_k)
     
     t1 = time.time()
-    jacc_res = search_jaccard(query, top_k)
+    jacc_res = search_jaccard.__wrapped__(query, top_k)
     
     t2 = time.time()
-    hybrid_res = search_hybrid(query, top_k)
+    hybrid_res = search_hybrid.__wrapped__(query, top_k)
     
     t3 = time.time()
 
-    # 4. Ambil ID Hasil
+    # 3. Ambil ID Hasil
     tfidf_ids = [r["no"] for r in tfidf_res]
     jacc_ids = [r["no"] for r in jacc_res]
     hybrid_ids = [r["no"] for r in hybrid_res]
 
-    # 5. Hitung Statistik
+    # 4. Hitung Statistik
     p_t, r_t, f1_t = precision_recall_f1(relevant, tfidf_ids)
     p_j, r_j, f1_j = precision_recall_f1(relevant, jacc_ids)
     p_h, r_h, f1_h = precision_recall_f1(relevant, hybrid_ids)
 
-    # 6. Return Hasil
+    # 5. Return Hasil
     return {
         "query": query,
         "runtime": {
@@ -98,4 +88,12 @@ def evaluate(query: str, top_k: Optional[int] = None):
         "counts": {
             "relevant_count": len(relevant)
         }
-    }
\ No newline at end of file
+    }
+
+if __name__ == "__main__":
+    import sys
+    import json
+
+    # Jalankan evaluasi: python evaluation.py ["query" ...]
+    for q in sys.argv[1:] or ["tari saman", "alat musik tiup", "pakaian adat jawa"]:
+        print(json.dumps(evaluate(q), indent=2))
@@ -0,0 +1,11 @@
+import os
+
+
+def write_atomic(path, write, binary=True):
+    # write(f) into a temp file next to path, then rename it over path: a running server
+    # that has the old file memory-mapped keeps its (unlinked) copy instead of seeing it
+    # truncated and rewritten under its maps
+    tmp = path.with_name(path.name + ".tmp")
+    with (open(tmp, "wb") if binary else open(tmp, "w", encoding="utf-8")) as f:
+        write(f)
+    os.replace(tmp, path)
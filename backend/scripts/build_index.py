@@ -1,12 +1,13 @@
 # scripts/build_index.py
 import json
-import math
+import sys
 from pathlib import Path
-from collections import defaultdict, Counter
 import numpy as np
 from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+from atomic_io import write_atomic
+
 # Paths
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_CLEAN = BASE_DIR / "data_clean"
@@ -14,32 +15,119 @@ TOKENS_DIR = DATA_CLEAN / "tokens"
 MODELS_DIR = BASE_DIR / "models"
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
 
+# the index structures are built by search_engine, which also builds them at load time
+# when a file below is missing, so both always produce the same layout
+sys.path.insert(0, str(BASE_DIR))
+from search_engine import (  # noqa: E402
+    MMAP_VERSION, PostingsIndex, build_bm25, build_bm25_max_score, build_doc_terms, build_facets,
+    build_positions, build_postings, build_speller, build_suggest, build_token_offsets,
+    docstore_columns, encode_postings, normalize_tfidf,
+)
+
 PREPROCESSED_FILE = DATA_CLEAN / "preprocessed_dataset.json"
-INVERTED_FILE = DATA_CLEAN / "inverted_index.json"
+INVERTED_FILE = DATA_CLEAN / "inverted_index.bin"
+TOKEN_OFFSETS_FILE = DATA_CLEAN / "token_offsets.npz"
 TFIDF_VOCAB_FILE = MODELS_DIR / "tfidf_vocab.json"
 TFIDF_MATRIX_NPZ = MODELS_DIR / "tfidf_matrix.npz"
 TFIDF_MODEL_PKL = MODELS_DIR / "tfidf_vectorizer.pkl"
+TFIDF_IDF_FILE = MODELS_DIR / "tfidf_idf.npy"
+SUGGEST_NPZ = MODELS_DIR / "suggest.npz"
+SPELLER_NPZ = MODELS_DIR / "speller.npz"
+FACETS_NPZ = MODELS_DIR / "facets.npz"
+MMAP_DIR = MODELS_DIR / "mmap"
+DOCSTORE_DIR = MODELS_DIR / "docstore"
+
+def save_npy(path, a):
+    write_atomic(path, lambda f: np.save(f, a))
+
+def save_json(path, obj, **kwargs):
+    write_atomic(path, lambda f: json.dump(obj, f, **kwargs), binary=False)
 
 def load_docs():
     docs = json.load(open(PREPROCESSED_FILE, encoding="utf-8"))
     return docs
 
 def build_inverted_index(docs):
-    inverted = defaultdict(list)
-    for doc in docs:
-        doc_id = int(doc.get("no", doc.get("id", docs.index(doc))))
-        tokens = doc.get("tokens", [])
-        seen = set()
-        for t in tokens:
-            if t not in seen:
-                inverted[t].append(doc_id)
-                seen.add(t)
-    # convert defaultdict->dict for JSON
-    inverted = {k: v for k, v in inverted.items()}
-    with open(INVERTED_FILE, "w", encoding="utf-8") as f:
-        json.dump(inverted, f, ensure_ascii=False, indent=2)
+    # binary postings (doc "no" + term frequency per posting), read by search_engine.PostingsIndex
+    data = encode_postings(build_postings(docs))
+    write_atomic(INVERTED_FILE, lambda f: f.write(data))
     print(f"Saved inverted index → {INVERTED_FILE}")
-    return inverted
+    return PostingsIndex(data)
+
+def save_doc_terms(docs):
+    # global term dictionary + per-doc sorted unique term ids (CSR indptr/indices)
+    term_ids, indptr, indices = build_doc_terms(docs)
+    save_mmap_arrays("doc_terms", {
+        "doc_terms_dict": np.frombuffer("\n".join(term_ids).encode("utf-8"), dtype=np.uint8),
+        "doc_terms_indptr": indptr, "doc_terms_indices": indices,
+    }, n_docs=len(docs), n_terms=len(term_ids))
+    return term_ids
+
+def save_bm25(docs, term_ids):
+    # per-term IDF, per-doc lengths and term frequencies (CSC: one column of postings per term)
+    # + per-term upper bound of the contribution, for MaxScore pruning of top-k queries
+    tf, idf, doc_len, k1, b = build_bm25(docs, term_ids)
+    save_mmap_arrays("bm25", {
+        "bm25_tf_data": tf.data, "bm25_tf_indices": tf.indices, "bm25_tf_indptr": tf.indptr,
+        "bm25_idf": idf, "bm25_doc_len": doc_len,
+        "bm25_max_score": build_bm25_max_score(tf, idf, doc_len, k1, b),
+    }, n_docs=len(docs), n_terms=len(term_ids), k1=k1, b=b)
+    return tf
+
+def save_positions(docs, term_ids, tf):
+    # sorted token positions of every BM25 posting, for phrase matching and proximity
+    indptr, data = build_positions(docs, term_ids, tf)
+    save_mmap_arrays("positions", {"pos_indptr": indptr, "pos_data": data}, n_docs=len(docs))
+
+def save_token_offsets(docs):
+    # char span in "teks" of every doc token (CSR: token k of doc i = start/end[indptr[i] + k]),
+    # for snippet highlights
+    offsets = build_token_offsets(docs)
+    write_atomic(TOKEN_OFFSETS_FILE, lambda f: np.savez(f, **offsets))
+    print(f"Saved token offsets → {TOKEN_OFFSETS_FILE}")
+
+def save_suggest(docs, inverted):
+    # sorted autocomplete entries: document titles (judul) + vocabulary terms, with doc frequency
+    arrays = build_suggest(docs, inverted)
+    write_atomic(SUGGEST_NPZ, lambda f: np.savez(f, **arrays))
+    print(f"Saved autocomplete entries → {SUGGEST_NPZ}")
+
+def save_speller(inverted):
+    # SymSpell deletion index of the vocabulary (sorted delete variants -> term numbers),
+    # for typo correction of query terms
+    arrays = build_speller(inverted)
+    write_atomic(SPELLER_NPZ, lambda f: np.savez(f, **arrays))
+    print(f"Saved speller → {SPELLER_NPZ}")
+
+def save_facets(docs):
+    # one packed bitmap (bit i = doc index i) per distinct value of each facet field
+    arrays = {"n_docs": np.int64(len(docs))}
+    for field, (values, bits) in build_facets(docs).items():
+        arrays[f"{field}_values"] = np.array(values, dtype=str)
+        arrays[f"{field}_bits"] = np.packbits(bits, axis=1)
+    write_atomic(FACETS_NPZ, lambda f: np.savez(f, **arrays))
+    print(f"Saved facet bitmaps → {FACETS_NPZ}")
+
+def save_docstore(docs):
+    # columnar documents read by search_engine.DocStore; manifest written last
+    DOCSTORE_DIR.mkdir(parents=True, exist_ok=True)
+    manifest, arrays = docstore_columns(docs)
+    for name, a in arrays.items():
+        save_npy(DOCSTORE_DIR / f"{name}.npy", a)
+    save_json(DOCSTORE_DIR / "manifest.json", manifest, ensure_ascii=False, indent=2)
+    print(f"Saved document store → {DOCSTORE_DIR}")
+
+def save_mmap_arrays(group, arrays, **meta):
+    # raw .npy arrays, opened with np.memmap by search_engine; the group manifest
+    # (shapes + dtypes) is written last and checked on open
+    MMAP_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = {"version": MMAP_VERSION, **meta, "arrays": {}}
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        save_npy(MMAP_DIR / f"{name}.npy", a)
+        manifest["arrays"][name] = {"shape": list(a.shape), "dtype": a.dtype.str}
+    save_json(MMAP_DIR / f"{group}.json", manifest, indent=2)
+    print(f"Saved memory-mapped arrays ({group}) → {MMAP_DIR}")
 
 def build_tfidf(docs):
     # use clean_text field as input for TF-IDF
@@ -48,28 +136,53 @@ def build_tfidf(docs):
     X = vectorizer.fit_transform(texts)  # sparse matrix
     # save vocab
     vocab = {k: int(v) for k, v in vectorizer.vocabulary_.items()}
-    with open(TFIDF_VOCAB_FILE, "w", encoding="utf-8") as f:
-        json.dump(vocab, f, ensure_ascii=False, indent=2)
+    save_json(TFIDF_VOCAB_FILE, vocab, ensure_ascii=False, indent=2)
+    # save idf (float64, column order of the vocab): with the vocab this is all
+    # search_engine.QueryVectorizer needs to vectorize queries without sklearn
+    save_npy(TFIDF_IDF_FILE, vectorizer.idf_)
     # save sparse matrix (.npz)
-    sparse.save_npz(TFIDF_MATRIX_NPZ, X)
+    write_atomic(TFIDF_MATRIX_NPZ, lambda f: sparse.save_npz(f, X))
     # save vectorizer (pickle) for future direct transform of query
     import pickle
-    with open(TFIDF_MODEL_PKL, "wb") as f:
-        pickle.dump(vectorizer, f)
+    write_atomic(TFIDF_MODEL_PKL, lambda f: pickle.dump(vectorizer, f))
     print(f"Saved TF-IDF vocab → {TFIDF_VOCAB_FILE}")
     print(f"Saved TF-IDF matrix (.npz) → {TFIDF_MATRIX_NPZ}")
     print(f"Saved TF-IDF vectorizer (.pkl) → {TFIDF_MODEL_PKL}")
+    build_mmap_tfidf(X)
     return vectorizer, X
 
+def build_mmap_tfidf(X):
+    # CSC with L2-normalized float32 rows, the layout search_engine scores on
+    Xn = normalize_tfidf(X)
+    save_mmap_arrays("tfidf", {
+        "tfidf_csc_data": Xn.data, "tfidf_csc_indices": Xn.indices, "tfidf_csc_indptr": Xn.indptr,
+    }, n_docs=X.shape[0], n_features=X.shape[1])
+
 def main():
     print("Loading docs...")
     docs = load_docs()
     print(f"{len(docs)} docs loaded.")
     print("Building inverted index...")
     inverted = build_inverted_index(docs)
+    print("Building doc term ids...")
+    term_ids = save_doc_terms(docs)
+    print("Building BM25 statistics...")
+    tf = save_bm25(docs, term_ids)
+    print("Building token positions...")
+    save_positions(docs, term_ids, tf)
+    print("Building token offsets...")
+    save_token_offsets(docs)
+    print("Building autocomplete entries...")
+    save_suggest(docs, inverted)
+    print("Building speller...")
+    save_speller(inverted)
+    print("Building facet bitmaps...")
+    save_facets(docs)
+    print("Building document store...")
+    save_docstore(docs)
     print("Building TF-IDF...")
     vectorizer, X = build_tfidf(docs)
     print("Index and TF-IDF build finished.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
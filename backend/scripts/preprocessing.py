@@ -5,6 +5,10 @@ import pandas as pd
 from tqdm import tqdm
 from pathlib import Path
 
+# Semua file yang dibaca search_engine ditulis lewat temp file + rename (helper yang
+# sama dengan build_index), supaya server yang sedang reload tidak membaca file setengah jadi
+from atomic_io import write_atomic
+
 # Sastrawi
 from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
 from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
@@ -13,6 +17,7 @@ from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_CLEAN = BASE_DIR / "data_clean"
 TOKENS_DIR = DATA_CLEAN / "tokens"
+STEM_LEXICON_FILE = DATA_CLEAN / "stem_lexicon.json"
 
 DATA_CLEAN.mkdir(exist_ok=True)
 TOKENS_DIR.mkdir(exist_ok=True)
@@ -51,6 +56,28 @@ stopwords = stop_sastrawi.union(stop_custom)
 
 stemmer = StemmerFactory().create_stemmer()
 
+# Lexicon kata → kata dasar. Dipakai ulang antar run (dan oleh search_engine)
+# supaya Sastrawi hanya dipanggil untuk kata yang belum pernah dilihat.
+def load_stem_lexicon():
+    if STEM_LEXICON_FILE.exists():
+        with open(STEM_LEXICON_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def save_stem_lexicon(lexicon):
+    write_atomic(STEM_LEXICON_FILE,
+                 lambda f: json.dump(dict(sorted(lexicon.items())), f, ensure_ascii=False),
+                 binary=False)
+
+stem_lexicon = load_stem_lexicon()
+
+def stem_word(word):
+    stem = stem_lexicon.get(word)
+    if stem is None:
+        stem = stemmer.stem(word)
+        stem_lexicon[word] = stem
+    return stem
+
 # ============================================================
 # 4. CLEANING
 # ============================================================
@@ -76,7 +103,7 @@ def remove_stopwords(tokens):
     return [t for t in tokens if t not in stopwords]
 
 def apply_stemming(tokens):
-    return [stemmer.stem(t) for t in tokens]
+    return [stem_word(t) for t in tokens]
 
 # ============================================================
 # 6. PIPELINE UTAMA
@@ -132,10 +159,11 @@ def preprocess_dataset():
     out_file = DATA_CLEAN / "preprocessed_dataset.json"
     json_text = df.to_json(orient="records", indent=2, force_ascii=False)
     json_text = json_text.replace("\\/", "/")  # Hapus escaped slash
-    with open(out_file, "w", encoding="utf-8") as f:
-        f.write(json_text)
+    write_atomic(out_file, lambda f: f.write(json_text), binary=False)
+
+    save_stem_lexicon(stem_lexicon)
 
-    print(f"\n✅ Preprocessing selesai! Hasil disimpan di:\n- {out_file}\n- Folder tokens/: {TOKENS_DIR}")
+    print(f"\n✅ Preprocessing selesai! Hasil disimpan di:\n- {out_file}\n- Folder tokens/: {TOKENS_DIR}\n- Stem lexicon: {STEM_LEXICON_FILE}")
 
     return df
 
@@ -1,31 +1,95 @@
 import json
+import logging
 import math
+import struct
 import time
+import threading
+import functools
+import contextlib
+import contextvars
+from collections import OrderedDict, Counter
+from collections.abc import Mapping, Sequence
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import numpy as np
 from scipy import sparse
-from sklearn.metrics.pairwise import cosine_similarity
 import re, string
 
 # Sastrawi
 from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
 from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
 
+_log = logging.getLogger(__name__)
+
 # Paths
 BASE_DIR = Path(__file__).resolve().parent
 DATA_CLEAN = BASE_DIR / "data_clean"
 MODELS_DIR = BASE_DIR / "models"
 PREPROCESSED_FILE = DATA_CLEAN / "preprocessed_dataset.json"
-INVERTED_FILE = DATA_CLEAN / "inverted_index.json"
-TFIDF_MODEL_PKL = MODELS_DIR / "tfidf_vectorizer.pkl"
+INVERTED_FILE = DATA_CLEAN / "inverted_index.bin"
+TFIDF_VOCAB_FILE = MODELS_DIR / "tfidf_vocab.json"
+TFIDF_IDF_FILE = MODELS_DIR / "tfidf_idf.npy"
 TFIDF_MATRIX_NPZ = MODELS_DIR / "tfidf_matrix.npz"
+SUGGEST_NPZ = MODELS_DIR / "suggest.npz"
+SPELLER_NPZ = MODELS_DIR / "speller.npz"
+FACETS_NPZ = MODELS_DIR / "facets.npz"
+STEM_LEXICON_FILE = DATA_CLEAN / "stem_lexicon.json"
+# Raw .npy arrays opened with np.memmap, so every worker shares one page-cache copy
+MMAP_DIR = MODELS_DIR / "mmap"
+MMAP_VERSION = 2
+DOCSTORE_DIR = MODELS_DIR / "docstore"
+DOCSTORE_VERSION = 2
+TOKEN_OFFSETS_FILE = DATA_CLEAN / "token_offsets.npz"
+# data_clean/ files the engine loads (models/ is watched as a whole), see check_index
+INDEX_FILES = (PREPROCESSED_FILE, INVERTED_FILE, TOKEN_OFFSETS_FILE, STEM_LEXICON_FILE)
+
+# Binary postings format (see POSTINGS below)
+POSTINGS_MAGIC = b"SWIX"
+POSTINGS_VERSION = 1
+POSTINGS_SKIP = 64  # postings per skip-table block
+
+# Result cache
+CACHE_SIZE = 1024       # max cached queries (LRU eviction)
+CACHE_TTL = None        # seconds before an entry expires, None = never
+CACHE_CHECK_EVERY = 1.0 # seconds between checks of the index files for changes (reload)
+STEM_CACHE_SIZE = 10000 # memoized stems for words missing from the stem lexicon
+
+# BM25 parameters: build_index stores them in the manifest of the models/mmap "bm25" group,
+# whose k1 / b are used at load time (these only when the group is missing or stale and
+# the statistics are rebuilt from the docs)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Typo tolerance (SymSpell): unknown query terms are replaced by the closest vocabulary term
+FUZZY_MAX_DISTANCE = 2
+FUZZY_PREFIX_LENGTH = 7  # only the first chars are indexed, as in SymSpell
+SPELLER_VERSION = 1  # bump when the deletion index changes, older speller.npz files are rebuilt
+
+# Doc store columns: integer ids, small-vocabulary codes; tokens / clean_text / teks are
+# index data and stay in the JSON (strings are every other field)
+DOCSTORE_INT = ("no",)
+DOCSTORE_CODES = ("kategori", "asal_daerah")
+DOCSTORE_SKIP = ("tokens", "clean_text", "teks")
 
-# Lazy loaded
-_docs = None
-_vectorizer = None
-_tfidf_matrix = None
-_inverted = None
+# Document fields with a bitmap per value, for filters and counts
+FACET_FIELDS = ("kategori", "asal_daerah")
+
+# Autocomplete keys are stored as fixed-width UTF-8 prefixes of this many bytes
+SUGGEST_KEY_BYTES = 48
+SUGGEST_VERSION = 2  # bump when the entries change, older suggest.npz files are rebuilt
+
+# Snippets: length of the deskripsi window and the context kept before the first match
+SNIPPET_CHARS = 200
+SNIPPET_LEAD = 40
+
+# Phrase-proximity boost per scorer, on the 0-1 scale of its raw score (query bigram as an
+# exact phrase = full boost), added after the score threshold: it reorders the results but
+# never adds or drops one. app.py ranks its scores with the same weights
+PHRASE_BOOST = {"tfidf": 0.1, "jaccard": 0.1, "hybrid": 0.15}
+
+# Documents and indexes (an EngineState, see LOAD), loaded on first use and replaced as
+# a whole when the index files are rebuilt
+_state = None
 
 # Preprocess
 _stop_sastrawi = set(StopWordRemoverFactory().get_stop_words())
@@ -38,33 +102,766 @@ _stop_custom = set([
     "tersebut","suatu","sebuah","digunakan","berasal","daerah","tradisional"
 ])
 _stopwords = _stop_sastrawi.union(_stop_custom)
-_stemmer = StemmerFactory().create_stemmer()
+_stemmer = None  # Sastrawi, only created when a word is missing from the lexicon
+
+
+def _load_stem_lexicon():
+    # surface form -> stem, written by scripts/preprocessing.py
+    if STEM_LEXICON_FILE.exists():
+        return json.load(open(STEM_LEXICON_FILE, encoding="utf-8"))
+    return {}
+
+
+@functools.lru_cache(maxsize=STEM_CACHE_SIZE)
+def _stem_unseen(word: str) -> str:
+    global _stemmer
+    if _stemmer is None:
+        _stemmer = StemmerFactory().create_stemmer()
+    return _stemmer.stem(word)
+
+
+def _stem(st, word: str) -> str:
+    stem = st.stem_lexicon.get(word)
+    return stem if stem is not None else _stem_unseen(word)
 
 
 # ---------------------------------------------------
-# LOAD
+# DOC STORE (columnar documents, decoded per field on access)
 # ---------------------------------------------------
-def _ensure_loaded():
-    global _docs, _vectorizer, _tfidf_matrix, _inverted
-    if _docs is None:
-        _docs = json.load(open(PREPROCESSED_FILE, encoding="utf-8"))
-    if _inverted is None and INVERTED_FILE.exists():
-        _inverted = json.load(open(INVERTED_FILE, encoding="utf-8"))
-    if _vectorizer is None:
-        import pickle
+# models/docstore/manifest.json lists the columns; per column kind:
+#   int   {name}.npy                      int64 per doc
+#   code  {name}.npy + "values" in manifest  int16 index into the distinct values
+#   str   {name}.offsets.npy + {name}.blob.npy  UTF-8 of doc i = blob[offsets[i]:offsets[i+1]]
+def code_value(value) -> str:
+    """Normalized value of a small-vocabulary field (DOCSTORE_CODES, FACET_FIELDS), the
+    same in stored documents, facet filters and facet counts."""
+    return "" if value is None else str(value).strip()
+
+
+def docstore_columns(docs):
+    """(manifest, arrays) of the columnar store for docs; build_index saves every array
+    as models/docstore/{name}.npy."""
+    fields = [f for f in (docs[0] if docs else {}) if f not in DOCSTORE_SKIP]
+    manifest = {"version": DOCSTORE_VERSION, "n_docs": len(docs), "columns": {}}
+    arrays = {}
+    for field in fields:
+        col = [doc.get(field) for doc in docs]
+        if field in DOCSTORE_INT:
+            manifest["columns"][field] = {"kind": "int"}
+            arrays[field] = np.array([int(v) for v in col], dtype=np.int64)
+        elif field in DOCSTORE_CODES:
+            col = [code_value(v) for v in col]
+            values = sorted(set(col))
+            codes = {v: k for k, v in enumerate(values)}
+            manifest["columns"][field] = {"kind": "code", "values": values}
+            arrays[field] = np.array([codes[v] for v in col], dtype=np.int16)
+        else:
+            raw = [("" if v is None else str(v)).encode("utf-8") for v in col]
+            offsets = np.zeros(len(raw) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in raw], out=offsets[1:])
+            manifest["columns"][field] = {"kind": "str"}
+            arrays[f"{field}.offsets"] = offsets
+            arrays[f"{field}.blob"] = np.frombuffer(b"".join(raw), dtype=np.uint8)
+    return manifest, arrays
+
+
+class _DocRecord(Mapping):
+    """One document of a DocStore; fields are decoded when read."""
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store, i):
+        self._store = store
+        self._i = i
+
+    def __getitem__(self, field):
+        return self._store.value(self._i, field)
+
+    def __contains__(self, field):
+        return field in self._store.columns
+
+    def __iter__(self):
+        return iter(self._store.fields)
+
+    def __len__(self):
+        return len(self._store.fields)
+
+
+class DocStore(Sequence):
+    """Read-only documents stored by column. The fields that are not stored (DOCSTORE_SKIP:
+    tokens, clean_text, teks) raise KeyError; passes over them read json_docs()."""
+
+    def __init__(self, manifest, arrays, json_docs=None):
+        self.n_docs = manifest["n_docs"]
+        self.columns = manifest["columns"]
+        self.fields = tuple(self.columns)
+        self._arrays = arrays
+        self._json_docs = json_docs
+        self._values = {f: c["values"] for f, c in self.columns.items() if c["kind"] == "code"}
+
+    @classmethod
+    def open(cls, directory: Path = DOCSTORE_DIR) -> Optional["DocStore"]:
+        """Memory-map the store written by build_index. None if it is missing or does not
+        pass the consistency check (column lengths, string offsets against their blob)."""
+        manifest_file = directory / "manifest.json"
+        if not manifest_file.exists():
+            return None
         try:
-            _vectorizer = pickle.load(open(TFIDF_MODEL_PKL, "rb"))
-        except Exception:
-            # fallback: construct vectorizer from saved vocab if pkl missing
-            vocab_path = MODELS_DIR / "tfidf_vocab.json"
-            if vocab_path.exists():
-                from sklearn.feature_extraction.text import TfidfVectorizer
-                vocab = json.load(open(vocab_path, encoding="utf-8"))
-                _vectorizer = TfidfVectorizer(vocabulary=vocab)
+            manifest = json.load(open(manifest_file, encoding="utf-8"))
+            if manifest.get("version") != DOCSTORE_VERSION:
+                return None
+            n = manifest["n_docs"]
+            arrays = {}
+            for field, col in manifest["columns"].items():
+                if col["kind"] == "str":
+                    offsets = np.load(directory / f"{field}.offsets.npy", mmap_mode="r")
+                    blob = np.load(directory / f"{field}.blob.npy", mmap_mode="r")
+                    if offsets.shape != (n + 1,) or offsets[0] != 0 or offsets[-1] != blob.shape[0]:
+                        return None
+                    arrays[f"{field}.offsets"], arrays[f"{field}.blob"] = offsets, blob
+                else:
+                    a = np.load(directory / f"{field}.npy", mmap_mode="r")
+                    if a.shape != (n,):
+                        return None
+                    arrays[field] = a
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(manifest, arrays)
+
+    @classmethod
+    def from_docs(cls, docs) -> "DocStore":
+        manifest, arrays = docstore_columns(docs)
+        return cls(manifest, arrays, json_docs=docs)
+
+    def json_docs(self):
+        """The preprocessed JSON docs: those the store was built from, else a fresh load
+        that the store does not keep (for one-off passes over the unstored fields)."""
+        if self._json_docs is not None:
+            return self._json_docs
+        return json.load(open(PREPROCESSED_FILE, encoding="utf-8"))
+
+    def value(self, i: int, field: str):
+        col = self.columns.get(field)
+        if col is None:
+            raise KeyError(field)
+        if col["kind"] == "int":
+            return int(self._arrays[field][i])
+        if col["kind"] == "code":
+            return self._values[field][self._arrays[field][i]]
+        offsets = self._arrays[f"{field}.offsets"]
+        return self._arrays[f"{field}.blob"][offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+
+    def column(self, field: str):
+        """Whole int/code column as an array (codes decoded to their values)."""
+        col = self.columns[field]
+        if col["kind"] == "code":
+            return np.array(col["values"], dtype=object)[self._arrays[field]]
+        return np.asarray(self._arrays[field])
+
+    def __getitem__(self, i):
+        if not -self.n_docs <= i < self.n_docs:
+            raise IndexError(i)
+        return _DocRecord(self, i % self.n_docs)
+
+    def __len__(self):
+        return self.n_docs
+
+
+def load_docs() -> DocStore:
+    """The documents: the memory-mapped store from models/docstore, or (if it is missing
+    or stale) a store built in memory from the preprocessed JSON."""
+    store = DocStore.open(DOCSTORE_DIR)
+    if store is None:
+        store = DocStore.from_docs(json.load(open(PREPROCESSED_FILE, encoding="utf-8")))
+    return store
+
+
+# ---------------------------------------------------
+# LOAD
+# ---------------------------------------------------
+# models/mmap holds raw .npy arrays ({name}.npy) in groups; {group}.json lists the shape +
+# dtype of every array of the group and is written after them
+_MMAP_GROUPS = {
+    "tfidf": ("tfidf_csc_data", "tfidf_csc_indices", "tfidf_csc_indptr"),
+    # term dictionary as newline-separated UTF-8, CSR of sorted term ids per doc
+    "doc_terms": ("doc_terms_dict", "doc_terms_indptr", "doc_terms_indices"),
+    # bm25_max_score: per-term upper bound of the BM25 contribution (for MaxScore pruning)
+    "bm25": ("bm25_tf_data", "bm25_tf_indices", "bm25_tf_indptr", "bm25_idf", "bm25_doc_len",
+             "bm25_max_score"),
+    # token positions per bm25 posting (see build_positions)
+    "positions": ("pos_indptr", "pos_data"),
+}
+
+
+def open_mmap_arrays(group: str) -> Optional[Dict[str, Any]]:
+    """Manifest + arrays of one group of models/mmap opened read-only (np.memmap). None if
+    the group is missing or any array disagrees with the manifest (shape, dtype)."""
+    manifest_file = MMAP_DIR / f"{group}.json"
+    if not manifest_file.exists():
+        return None
+    try:
+        manifest = json.load(open(manifest_file, encoding="utf-8"))
+        if manifest.get("version") != MMAP_VERSION:
+            return None
+        arrays = {}
+        for name, spec in manifest["arrays"].items():
+            a = np.load(MMAP_DIR / f"{name}.npy", mmap_mode="r")
+            if list(a.shape) != spec["shape"] or a.dtype.str != spec["dtype"]:
+                return None
+            arrays[name] = a
+    except (OSError, ValueError, KeyError):
+        return None
+    if any(name not in arrays for name in _MMAP_GROUPS[group]):
+        return None
+    return {"manifest": manifest, "arrays": arrays}
+
+
+def _compressed_ok(data, indices, indptr, n: int) -> bool:
+    """Whether CSR/CSC arrays describe n rows/columns (indptr bounds, indices per value)."""
+    return (indptr.shape[0] == n + 1 and indptr[0] == 0 and indptr[-1] == data.shape[0]
+            and indices.shape == data.shape)
+
+
+def build_doc_terms(docs):
+    """(term -> id over the sorted vocabulary, CSR indptr, sorted unique term ids per doc)."""
+    terms = sorted({t for doc in docs for t in doc.get("tokens", [])})
+    term_ids = {t: i for i, t in enumerate(terms)}
+    indptr = np.zeros(len(docs) + 1, dtype=np.int64)
+    indices = []
+    for i, doc in enumerate(docs):
+        indices.extend(sorted({term_ids[t] for t in doc.get("tokens", [])}))
+        indptr[i + 1] = len(indices)
+    return term_ids, indptr, np.array(indices, dtype=np.int32)
+
+
+def _load_doc_terms(docs, json_docs):
+    opened = open_mmap_arrays("doc_terms")
+    if opened is not None:
+        manifest, arrays = opened["manifest"], opened["arrays"]
+        indptr, indices = arrays["doc_terms_indptr"], arrays["doc_terms_indices"]
+        # only trust the persisted CSR if it was built for this dataset
+        if manifest["n_docs"] == len(docs) and _compressed_ok(indices, indices, indptr, len(docs)):
+            blob = arrays["doc_terms_dict"].tobytes().decode("utf-8")
+            terms = blob.split("\n") if manifest["n_terms"] else []
+            if len(terms) == manifest["n_terms"]:
+                return {t: i for i, t in enumerate(terms)}, indptr, indices
+    return build_doc_terms(json_docs())
+
+
+def build_bm25(docs, term_ids):
+    """(term frequencies as CSC, one column of postings per term id, idf, doc lengths, k1, b)."""
+    rows, cols, tfs = [], [], []
+    doc_len = np.zeros(len(docs), dtype=np.int32)
+    for i, doc in enumerate(docs):
+        tokens = doc.get("tokens", [])
+        doc_len[i] = len(tokens)
+        counts = {}
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        for t, tf in counts.items():
+            rows.append(i)
+            cols.append(term_ids[t])
+            tfs.append(tf)
+    tf = sparse.csc_matrix((np.array(tfs, dtype=np.float32), (rows, cols)),
+                           shape=(len(docs), len(term_ids)))
+    tf.sort_indices()
+    df = np.diff(tf.indptr)
+    idf = np.log(1 + (len(docs) - df + 0.5) / (df + 0.5)).astype(np.float32)
+    return tf, idf, doc_len, BM25_K1, BM25_B
+
+
+def build_bm25_max_score(tf, idf, doc_len, k1, b):
+    """Per term id, the largest BM25 contribution over its postings (0 for an empty column),
+    computed exactly as _bm25_postings does so it bounds every contribution of the term."""
+    cols = np.repeat(np.arange(tf.shape[1]), np.diff(tf.indptr))
+    tfs = tf.data.astype(np.float64)
+    avgdl = doc_len.mean() if doc_len.size else 0
+    norm = k1 * (1 - b + b * doc_len[tf.indices] / avgdl)
+    contrib = idf[cols].astype(np.float64) * tfs * (k1 + 1) / (tfs + norm)
+    max_score = np.zeros(tf.shape[1], dtype=np.float64)
+    np.maximum.at(max_score, cols, contrib)
+    return max_score
+
+
+def _load_bm25(docs, json_docs, term_ids):
+    opened = open_mmap_arrays("bm25")
+    if opened is not None:
+        manifest, arrays = opened["manifest"], opened["arrays"]
+        data, indices, indptr = (arrays[f"bm25_tf_{k}"] for k in ("data", "indices", "indptr"))
+        # only trust the persisted statistics if they match this dataset and term dictionary
+        if (manifest["n_docs"] == len(docs) and manifest["n_terms"] == len(term_ids)
+                and _compressed_ok(data, indices, indptr, len(term_ids))
+                and arrays["bm25_idf"].shape == (len(term_ids),)
+                and arrays["bm25_doc_len"].shape == (len(docs),)
+                and arrays["bm25_max_score"].shape == (len(term_ids),)):
+            tf = sparse.csc_matrix((data, indices, indptr), shape=(len(docs), len(term_ids)))
+            return (tf, arrays["bm25_idf"], arrays["bm25_doc_len"], float(manifest["k1"]),
+                    float(manifest["b"]), arrays["bm25_max_score"])
+    tf, idf, doc_len, k1, b = build_bm25(json_docs(), term_ids)
+    return tf, idf, doc_len, k1, b, build_bm25_max_score(tf, idf, doc_len, k1, b)
+
+
+def build_positions(docs, term_ids, tf):
+    """Token positions aligned with the postings of tf (build_bm25): (indptr, data), the
+    sorted positions of posting g (global index into tf.data) are data[indptr[g]:indptr[g+1]]."""
+    tokens = [doc.get("tokens", []) for doc in docs]
+    lengths = np.array([len(t) for t in tokens], dtype=np.int64)
+    term = np.fromiter((term_ids[t] for ts in tokens for t in ts), dtype=np.int64,
+                       count=int(lengths.sum()))
+    doc = np.repeat(np.arange(len(docs)), lengths)
+    pos = np.arange(term.size) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    # postings are ordered by term id then doc index, as the columns of the CSC
+    order = np.lexsort((pos, doc, term))
+    # stored as absolute int32 positions, not delta-encoded: the arrays are memory-mapped
+    # and sliced in place by _term_positions and the snippet matcher, where deltas would
+    # need a cumsum per lookup and a decoded copy (the whole file is ~4 bytes per token)
+    indptr = np.zeros(tf.nnz + 1, dtype=np.int64)
+    np.cumsum(tf.data.astype(np.int64), out=indptr[1:])
+    return indptr, pos[order].astype(np.int32)
+
+
+def _load_positions(docs, json_docs, term_ids, tf):
+    opened = open_mmap_arrays("positions")
+    if opened is not None:
+        manifest, arrays = opened["manifest"], opened["arrays"]
+        indptr, data = arrays["pos_indptr"], arrays["pos_data"]
+        # only trust the persisted positions if they cover exactly the tf postings
+        if (manifest["n_docs"] == len(docs) and indptr.shape == (tf.nnz + 1,)
+                and indptr[0] == 0 and indptr[-1] == data.shape[0]
+                and np.array_equal(np.diff(indptr), tf.data)):
+            return indptr, data
+    return build_positions(json_docs(), term_ids, tf)
+
+
+def normalize_tfidf(X):
+    """CSC with L2-normalized float32 rows (the layout scored on and stored in models/mmap)."""
+    X = X.tocsr().astype(np.float32)
+    # L2-normalize rows once so a dot product with a unit query is the cosine
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    X = sparse.diags(1 / norms).astype(np.float32) @ X
+    return X.tocsc()
+
+
+def load_tfidf_matrix(n_docs: Optional[int] = None):
+    """TF-IDF doc matrix as CSC with L2-normalized float32 rows, zero-copy from models/mmap
+    when it is there and consistent (and built for n_docs docs), else from the .npz."""
+    opened = open_mmap_arrays("tfidf")
+    if opened is not None:
+        manifest, arrays = opened["manifest"], opened["arrays"]
+        data, indices, indptr = (arrays[f"tfidf_csc_{k}"] for k in ("data", "indices", "indptr"))
+        if ((n_docs is None or manifest["n_docs"] == n_docs)
+                and _compressed_ok(data, indices, indptr, manifest["n_features"])):
+            return sparse.csc_matrix((data, indices, indptr),
+                                     shape=(manifest["n_docs"], manifest["n_features"]))
+    return normalize_tfidf(sparse.load_npz(TFIDF_MATRIX_NPZ))
+
+
+# ---------------------------------------------------
+# QUERY VECTORS (TF-IDF without scikit-learn)
+# ---------------------------------------------------
+class QueryVectorizer:
+    """transform() of the fitted TfidfVectorizer (scripts/build_index.py) from its exported
+    vocabulary and idf: word tokens of 2+ chars, lowercased, unigrams + bigrams, counts
+    times idf, rows L2-normalized."""
+    _token_re = re.compile(r"(?u)\b\w\w+\b")
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray):
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+
+    @classmethod
+    def load(cls) -> "QueryVectorizer":
+        """Vocabulary from tfidf_vocab.json, idf from tfidf_idf.npy; without the idf file
+        it is recomputed (smooth idf) from the document frequencies in the TF-IDF matrix."""
+        vocabulary = json.load(open(TFIDF_VOCAB_FILE, encoding="utf-8"))
+        idf = np.load(TFIDF_IDF_FILE) if TFIDF_IDF_FILE.exists() else None
+        if idf is None or idf.shape != (len(vocabulary),):
+            X = load_tfidf_matrix()
+            df = np.diff(X.indptr).astype(np.float64) + 1
+            idf = np.log((X.shape[0] + 1) / df) + 1
+        return cls(vocabulary, idf)
+
+    def _term_counts(self, text: str) -> Counter:
+        words = self._token_re.findall(text.lower())
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vocab = self.vocabulary
+        return Counter(vocab[g] for g in grams if g in vocab)
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            counts = sorted(self._term_counts(text).items())
+            cols = np.array([j for j, _ in counts], dtype=np.int32)
+            vals = np.array([c for _, c in counts], dtype=np.float64) * self.idf[cols]
+            norm = math.sqrt(sum(v * v for v in vals.tolist()))  # summed in order, as sklearn does
+            if norm > 0:
+                vals /= norm
+            indices.append(cols)
+            data.append(vals)
+            indptr.append(indptr[-1] + cols.size)
+        return sparse.csr_matrix(
+            (np.concatenate(data) if data else np.zeros(0),
+             np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+             np.array(indptr, dtype=np.int32)),
+            shape=(len(texts), len(self.idf)),
+        )
+
+
+# ---------------------------------------------------
+# POSTINGS: binary inverted index (inverted_index.bin)
+# ---------------------------------------------------
+# Layout (little-endian): a header, then five sections whose byte lengths are in the header
+#   dict      sorted terms, UTF-8, newline separated
+#   df        vbyte doc frequency per term
+#   lengths   vbyte byte length of every term's postings
+#   postings  per term, (doc, tf) pairs as vbytes; the first doc of every block of
+#             POSTINGS_SKIP postings is absolute, the others are gaps to the previous doc
+#   skips     for terms with df > skip: vbyte (first doc, byte offset) of blocks 1, 2, ...
+# vbyte: 7 bits per byte, low group first, high bit set on every byte but the last.
+_POSTINGS_HEADER = struct.Struct("<4sHHIIQQQQQ")  # magic, version, flags, skip, n_terms, 5 lengths
+_POSTINGS_TF = 1  # flag: postings carry term frequencies
+
+
+def _vbyte_lengths(values: np.ndarray) -> np.ndarray:
+    nbytes = np.ones(values.size, dtype=np.int64)
+    for k in range(1, 10):
+        nbytes += values >= (1 << (7 * k))
+    return nbytes
+
+
+def _vbyte_encode(values) -> np.ndarray:
+    values = np.asarray(values, dtype=np.int64)
+    nbytes = _vbyte_lengths(values)
+    starts = np.zeros(values.size, dtype=np.int64)
+    np.cumsum(nbytes[:-1], out=starts[1:])
+    out = np.zeros(int(nbytes.sum()), dtype=np.uint8)
+    for k in range(int(nbytes.max(initial=0))):
+        m = nbytes > k
+        more = np.where(nbytes[m] > k + 1, 0x80, 0)
+        out[starts[m] + k] = ((values[m] >> (7 * k)) & 0x7F) | more
+    return out
+
+
+def _vbyte_decode(buf) -> np.ndarray:
+    buf = np.asarray(buf, dtype=np.uint8)
+    if buf.size == 0 or buf.max() < 0x80:
+        return buf.astype(np.int64)  # every value fits in one byte
+    ends = np.flatnonzero(buf < 0x80)
+    if ends.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.zeros(ends.size, dtype=np.int64)
+    starts[1:] = ends[:-1] + 1
+    shift = 7 * (np.arange(ends[-1] + 1) - np.repeat(starts, ends - starts + 1))
+    return np.add.reduceat((buf[:ends[-1] + 1] & 0x7F).astype(np.int64) << shift, starts)
+
+
+def build_postings(docs) -> Dict[str, Any]:
+    """term -> (sorted doc numbers, term frequencies) of the doc tokens."""
+    nos = [int(doc.get("no", i)) for i, doc in enumerate(docs)]
+    postings = {}
+    for i in sorted(range(len(docs)), key=nos.__getitem__):
+        for t, tf in Counter(docs[i].get("tokens", [])).items():
+            doc_list, tfs = postings.setdefault(t, ([], []))
+            doc_list.append(nos[i])
+            tfs.append(tf)
+    return postings
+
+
+def encode_postings(postings: Dict[str, Any], skip: int = POSTINGS_SKIP) -> bytes:
+    """postings: term -> (sorted doc numbers, term frequencies). Returns the file contents."""
+    terms = sorted(postings, key=lambda t: t.encode("utf-8"))
+    dict_bytes = "\n".join(terms).encode("utf-8")
+
+    df = np.array([len(postings[t][0]) for t in terms], dtype=np.int64)
+    docs = np.array([d for t in terms for d in postings[t][0]], dtype=np.int64)
+    tfs = np.array([f for t in terms for f in postings[t][1]], dtype=np.int64)
+    term_start = np.zeros(len(terms), dtype=np.int64)
+    np.cumsum(df[:-1], out=term_start[1:])
+    rank = np.arange(docs.size) - np.repeat(term_start, df)  # posting number inside its term
+    gaps = np.diff(docs, prepend=0)
+    block_start = rank % skip == 0
+    gaps[block_start] = docs[block_start]
+    values = np.column_stack((gaps, tfs)).ravel()
+
+    # byte offset of every posting inside its term's postings
+    nbytes = _vbyte_lengths(values)
+    pair_bytes = nbytes[0::2] + nbytes[1::2]
+    pair_end = np.cumsum(pair_bytes)
+    term_end = pair_end[term_start + df - 1] if docs.size else np.zeros(0, dtype=np.int64)
+    term_bytes = np.diff(term_end, prepend=0)
+    offset = pair_end - pair_bytes - np.repeat(term_end - term_bytes, df)
+    skipped = block_start & (rank > 0)
+    skips = np.column_stack((docs[skipped], offset[skipped])).ravel()
+
+    sections = [dict_bytes, _vbyte_encode(df).tobytes(), _vbyte_encode(term_bytes).tobytes(),
+                _vbyte_encode(values).tobytes(), _vbyte_encode(skips).tobytes()]
+    header = _POSTINGS_HEADER.pack(POSTINGS_MAGIC, POSTINGS_VERSION, _POSTINGS_TF, skip,
+                                   len(terms), *(len(s) for s in sections))
+    return header + b"".join(sections)
+
+
+class PostingsIndex(Mapping):
+    """Read-only inverted index over the binary postings: term -> sorted doc numbers.
+    Only the term dictionary is decoded on load; postings are decoded when accessed."""
+
+    def __init__(self, data):
+        if len(data) < _POSTINGS_HEADER.size:
+            raise ValueError("postings file is truncated")
+        magic, version, flags, skip, n_terms, *lengths = _POSTINGS_HEADER.unpack_from(data)
+        if magic != POSTINGS_MAGIC or version != POSTINGS_VERSION:
+            raise ValueError(f"unsupported postings file (magic {magic!r}, version {version})")
+        if _POSTINGS_HEADER.size + sum(lengths) != len(data):
+            raise ValueError("postings file size does not match its header")
+        self.skip = skip
+        self._has_tf = bool(flags & _POSTINGS_TF)
+        buf = np.frombuffer(data, dtype=np.uint8)
+        sections, pos = [], _POSTINGS_HEADER.size
+        for n in lengths:
+            sections.append(buf[pos:pos + n])
+            pos += n
+        dict_buf, df_buf, len_buf, self._postings, skip_buf = sections
+
+        self.terms = dict_buf.tobytes().decode("utf-8").split("\n") if n_terms else []
+        if len(self.terms) != n_terms:
+            raise ValueError("postings term dictionary does not match its header")
+        self._ids = {t: j for j, t in enumerate(self.terms)}
+
+        self._df = _vbyte_decode(df_buf)
+        self._start = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(_vbyte_decode(len_buf), out=self._start[1:])
+        blocks = np.where(self._df > skip, (self._df - 1) // skip, 0)
+        self._skip_start = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(blocks, out=self._skip_start[1:])
+        skips = _vbyte_decode(skip_buf)
+        self._skip_doc, self._skip_off = skips[0::2], skips[1::2]
+
+    @classmethod
+    def from_file(cls, path: Path) -> "PostingsIndex":
+        # mapped, not read: the postings pages are shared by every process using the file
+        return cls(np.memmap(path, dtype=np.uint8, mode="r"))
+
+    @classmethod
+    def from_postings(cls, postings: Dict[str, Any]) -> "PostingsIndex":
+        return cls(encode_postings(postings))
+
+    def _decode(self, j: int, lo: int = 0, hi: Optional[int] = None):
+        """(docs, tfs) of term id j from byte lo to hi of its postings; lo must start a block."""
+        start = self._start[j]
+        end = self._start[j + 1] if hi is None else start + hi
+        values = _vbyte_decode(self._postings[start + lo:end])
+        gaps, tfs = values[0::2], values[1::2]
+        csum = np.cumsum(gaps)
+        if gaps.size <= self.skip:
+            return csum, tfs
+        # gaps restart at every block: cumulative sum per block
+        base = np.repeat(csum[::self.skip] - gaps[::self.skip], self.skip)[:gaps.size]
+        return csum - base, tfs
+
+    def __getitem__(self, term: str) -> np.ndarray:
+        return self._decode(self._ids[term])[0]
+
+    def __contains__(self, term) -> bool:
+        return term in self._ids
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def doc_freq(self, term: str) -> int:
+        j = self._ids.get(term)
+        return 0 if j is None else int(self._df[j])
+
+    def postings(self, term: str):
+        """(sorted doc numbers, term frequencies) of term."""
+        return self._decode(self._ids[term])
+
+    def intersect(self, terms: List[str]) -> np.ndarray:
+        """Sorted doc numbers containing every term. Starts from the rarest term and only
+        decodes the blocks of the longer postings that can hold a remaining candidate."""
+        ids = [self._ids.get(t) for t in terms]
+        if not ids or None in ids:
+            return np.zeros(0, dtype=np.int64)
+        ids = sorted(set(ids), key=lambda j: self._df[j])
+        result = self._decode(ids[0])[0]
+        for j in ids[1:]:
+            if result.size == 0:
+                break
+            s, e = self._skip_start[j], self._skip_start[j + 1]
+            if e == s:
+                docs = self._decode(j)[0]
             else:
-                raise
-    if _tfidf_matrix is None:
-        _tfidf_matrix = sparse.load_npz(TFIDF_MATRIX_NPZ)
+                bounds = np.concatenate([[0], self._skip_off[s:e], [self._start[j + 1] - self._start[j]]])
+                blocks = np.unique(np.searchsorted(self._skip_doc[s:e], result, side="right"))
+                if 2 * blocks.size > e - s + 1:
+                    docs = self._decode(j)[0]  # most blocks needed, one decode is cheaper
+                else:
+                    docs = np.concatenate([self._decode(j, bounds[b], bounds[b + 1])[0] for b in blocks])
+            result = result[np.isin(result, docs, assume_unique=True)]
+        return result
+
+
+# ---------------------------------------------------
+# ENGINE STATE
+# ---------------------------------------------------
+class EngineState:
+    """Documents and indexes loaded from one version of the index files. A reload builds a
+    new EngineState and swaps it in with one assignment; every search takes the current one
+    once at entry (_ensure_loaded) and reads only from it, so a search never mixes two index
+    versions. The derived structures (speller, suggest, facets, offsets) are None until a
+    search first needs them and are then built on the state they belong to."""
+
+    def __init__(self, **fields):
+        self.generation = 0  # _index_generation when loaded, result caches compare it
+        self.stem_lexicon = {}  # surface form -> stem
+        self.docs = None  # DocStore
+        self.doc_nos = None  # doc "no" per doc index, used for deterministic tie-breaking
+        self.no_to_idx = None
+        # Category per doc as a small integer code into cat_values (lowercased "kategori")
+        self.cat_values = None
+        self.cat_codes = None
+        self.inverted = None  # PostingsIndex: term -> sorted doc "no" values
+        self.vectorizer = None  # QueryVectorizer
+        self.tfidf_matrix = None  # CSC, float32, rows pre-L2-normalized (column = term postings)
+        # Doc tokens as integer term ids (CSR): doc i -> doc_indices[doc_indptr[i]:doc_indptr[i+1]]
+        self.term_ids = None
+        self.doc_indptr = None
+        self.doc_indices = None
+        # Binary doc-term matrix over the same ids + number of unique terms per doc
+        self.doc_term_matrix = None
+        self.doc_term_counts = None
+        # BM25: term frequencies (CSC, column = postings of a term id), idf per term id, doc lengths
+        self.bm25_tf = None
+        self.bm25_idf = None
+        self.bm25_doc_len = None
+        self.bm25_k1 = BM25_K1
+        self.bm25_b = BM25_B
+        self.bm25_avgdl = None
+        # per term id, the largest BM25 contribution of the term (build_bm25_max_score)
+        self.bm25_max_score = None
+        # Token positions, aligned with the bm25_tf postings: posting g (global index into
+        # bm25_tf.data) -> sorted positions pos_data[pos_indptr[g]:pos_indptr[g+1]]
+        self.pos_indptr = None
+        self.pos_data = None
+        # SymSpell deletion index (build_speller): sorted delete variants of the term prefixes,
+        # CSR of vocabulary term numbers per variant, terms as offsets + UTF-8 blob
+        self.speller = None
+        # Autocomplete: sorted keys (S bytes) + kind (0 judul, 1 term), doc frequency, labels blob
+        self.suggest = None
+        # Facets: field -> (sorted values, bool bitmap per value over the doc indices)
+        self.facets = None
+        # Char span of every token in doc "teks" (CSR like the doc terms): token k of doc i ->
+        # start/end[indptr[i] + k]. Built from the docs if the offsets file is missing or stale,
+        # empty dict if even those do not line up (no highlights then).
+        self.offsets = None
+        for name, value in fields.items():
+            if name not in vars(self):
+                raise TypeError(f"unknown engine state field {name!r}")
+            setattr(self, name, value)
+
+
+_load_lock = threading.RLock()
+_loaded_version = None  # _index_version() of the files the state was loaded from
+_index_generation = 0   # bumped on every reload, result caches clear when it changes
+_checked_at = 0.0
+# state pinned by snapshot() for the engine calls of one request
+_pinned = contextvars.ContextVar("search_engine_state", default=None)
+
+
+def _load_state(generation: int = 0) -> EngineState:
+    """A complete EngineState from the index files, building what is missing from the docs."""
+    docs = load_docs()
+    doc_nos = docs.column("no").astype(np.int64)
+    kats = [k.lower() for k in docs.column("kategori")]
+    cat_values = sorted(set(kats))
+    # the JSON docs (tokens) for the structures that have to be built, parsed at most once
+    # and dropped when the state is loaded
+    json_docs = functools.lru_cache(maxsize=None)(docs.json_docs)
+    if INVERTED_FILE.exists():
+        inverted = PostingsIndex.from_file(INVERTED_FILE)
+    else:
+        inverted = PostingsIndex.from_postings(build_postings(json_docs()))
+    term_ids, doc_indptr, doc_indices = _load_doc_terms(docs, json_docs)
+    tf, idf, doc_len, k1, b, max_score = _load_bm25(docs, json_docs, term_ids)
+    pos_indptr, pos_data = _load_positions(docs, json_docs, term_ids, tf)
+    ones = np.ones(doc_indices.shape[0], dtype=np.int32)
+    return EngineState(
+        generation=generation, stem_lexicon=_load_stem_lexicon(),
+        docs=docs, doc_nos=doc_nos,
+        no_to_idx={no: i for i, no in enumerate(doc_nos.tolist())},
+        cat_values=cat_values,
+        cat_codes=np.array([cat_values.index(k) for k in kats], dtype=np.int8),
+        inverted=inverted, vectorizer=QueryVectorizer.load(),
+        tfidf_matrix=load_tfidf_matrix(len(docs)),
+        term_ids=term_ids, doc_indptr=doc_indptr, doc_indices=doc_indices,
+        doc_term_matrix=sparse.csr_matrix((ones, doc_indices, doc_indptr),
+                                          shape=(len(docs), len(term_ids))),
+        doc_term_counts=np.diff(doc_indptr),
+        bm25_tf=tf, bm25_idf=idf, bm25_doc_len=doc_len, bm25_k1=k1, bm25_b=b,
+        bm25_avgdl=doc_len.mean() if doc_len.size else 0, bm25_max_score=max_score,
+        pos_indptr=pos_indptr, pos_data=pos_data,
+    )
+
+
+def _ensure_loaded() -> EngineState:
+    """The state an engine call reads from: the one pinned by snapshot(), else the current
+    one (loaded on first use, reloaded first if the index files changed)."""
+    global _state, _loaded_version
+    st = _pinned.get()
+    if st is not None:
+        return st
+    check_index()
+    st = _state
+    if st is None:
+        with _load_lock:
+            if _state is None:
+                # taken before reading the files, so a rebuild during the load is seen later
+                _loaded_version = _index_version()
+                _state = _load_state(_index_generation)
+            st = _state
+    return st
+
+
+@contextlib.contextmanager
+def snapshot():
+    """Pin the current state for every engine call made inside the block (in this thread),
+    so results put together from several calls (doc rows, doc numbers, snippets) all come
+    from one index version even if the index is reloaded meanwhile."""
+    token = _pinned.set(_ensure_loaded())
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def check_index() -> int:
+    """Reload the engine state if the index files changed since it was loaded (looked at
+    most once per CACHE_CHECK_EVERY seconds). Returns the index generation.
+
+    The new state is loaded completely and then replaces the old one; searches already
+    running keep the old state object they took at entry. mmap'd arrays of the old state
+    stay valid because the build scripts replace files instead of rewriting them."""
+    global _state, _loaded_version, _index_generation, _checked_at
+    now = time.monotonic()
+    if _loaded_version is None or now - _checked_at < CACHE_CHECK_EVERY:
+        return _index_generation
+    with _load_lock:
+        if now - _checked_at < CACHE_CHECK_EVERY:
+            return _index_generation
+        _checked_at = now
+        version = _index_version()
+        if version != _loaded_version:
+            _state = _load_state(_index_generation + 1)
+            _loaded_version = version
+            _index_generation += 1
+    return _index_generation
+
+
+def _state_generation() -> int:
+    # generation of the state the caller computes with: the pinned one, else the current
+    st = _pinned.get()
+    return st.generation if st is not None else check_index()
 
 
 # ---------------------------------------------------
@@ -79,15 +876,161 @@ def clean_text_for_query(text: str) -> str:
     return text
 
 
+# ---------------------------------------------------
+# FUZZY TERMS (SymSpell deletion index over the vocabulary)
+# ---------------------------------------------------
+def _delete_levels(word: str, max_distance: int):
+    """Variants of word with 0, 1, ..., max_distance characters deleted, one set per level."""
+    levels = [{word}]
+    for _ in range(max_distance):
+        levels.append({w[:i] + w[i + 1:] for w in levels[-1] for i in range(len(w))})
+    return levels
+
+
+def build_speller(inverted):
+    """SymSpell deletion index over the terms of inverted (a PostingsIndex) as arrays: the
+    sorted UTF-8 delete variants (up to FUZZY_MAX_DISTANCE deletions) of every term's first
+    FUZZY_PREFIX_LENGTH chars, and per variant the numbers of the terms it comes from."""
+    terms = sorted(inverted)
+    deletes = {}
+    for t, term in enumerate(terms):
+        for d in set().union(*_delete_levels(term[:FUZZY_PREFIX_LENGTH], FUZZY_MAX_DISTANCE)):
+            deletes.setdefault(d, []).append(t)
+    keys = sorted(deletes)  # code point order = UTF-8 byte order
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum([len(deletes[k]) for k in keys], out=indptr[1:])
+    raw = [t.encode("utf-8") for t in terms]
+    term_offsets = np.zeros(len(raw) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in raw], out=term_offsets[1:])
+    return {
+        # format, settings and vocabulary size, checked before a persisted file is used
+        "version": np.int64(SPELLER_VERSION),
+        "max_distance": np.int64(FUZZY_MAX_DISTANCE),
+        "prefix_length": np.int64(FUZZY_PREFIX_LENGTH),
+        "n_terms": np.int64(len(terms)),
+        "keys": np.array([k.encode("utf-8") for k in keys], dtype=bytes),
+        "indptr": indptr,
+        "indices": np.array([t for k in keys for t in deletes[k]], dtype=np.int32),
+        "term_offsets": term_offsets,
+        "term_blob": np.frombuffer(b"".join(raw), dtype=np.uint8),
+    }
+
+
+def _ensure_speller(st):
+    if st.speller is None:
+        if SPELLER_NPZ.exists():
+            data = np.load(SPELLER_NPZ)
+            # only trust the persisted index if it was built with these settings for this vocabulary
+            if ("version" in data.files and int(data["version"]) == SPELLER_VERSION
+                    and int(data["max_distance"]) == FUZZY_MAX_DISTANCE
+                    and int(data["prefix_length"]) == FUZZY_PREFIX_LENGTH
+                    and int(data["n_terms"]) == len(st.inverted)):
+                st.speller = {name: data[name] for name in data.files}
+        if st.speller is None:
+            st.speller = build_speller(st.inverted)
+
+
+def _speller_terms(st, variant: str) -> List[str]:
+    """Vocabulary terms with variant among the delete variants of their prefix."""
+    sp = st.speller
+    key = variant.encode("utf-8")
+    g = int(np.searchsorted(sp["keys"], key))
+    if g == sp["keys"].size or sp["keys"][g] != key:
+        return []
+    offsets, blob = sp["term_offsets"], sp["term_blob"]
+    return [blob[offsets[t]:offsets[t + 1]].tobytes().decode("utf-8")
+            for t in sp["indices"][sp["indptr"][g]:sp["indptr"][g + 1]].tolist()]
+
+
+def _edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Damerau-Levenshtein (optimal string alignment) distance, max_distance + 1 if larger."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _correct_term(st, term: str) -> str:
+    """Closest vocabulary term within FUZZY_MAX_DISTANCE (fewest edits, then most docs),
+    or the term itself if it is known or nothing is close enough."""
+    _ensure_speller(st)
+    if term in st.inverted:
+        return term
+    # short words get fewer edits, otherwise almost anything would match
+    max_distance = min(FUZZY_MAX_DISTANCE, max(len(term) - 3, 0))
+    if max_distance == 0:
+        return term
+
+    best, best_key = term, None
+    seen = set()
+    for level, variants in enumerate(_delete_levels(term[:FUZZY_PREFIX_LENGTH], max_distance)):
+        # a candidate reached after `level` deletions is at least `level` edits away
+        if best_key is not None and level > best_key[0]:
+            break
+        for d in variants:
+            for cand in _speller_terms(st, d):
+                if cand in seen:
+                    continue
+                seen.add(cand)
+                limit = max_distance if best_key is None else best_key[0]
+                if abs(len(cand) - len(term)) > limit:
+                    continue
+                dist = _edit_distance(term, cand, limit)
+                if dist > limit:
+                    continue
+                key = (dist, -st.inverted.doc_freq(cand), cand)
+                if best_key is None or key < best_key:
+                    best, best_key = cand, key
+    return best
+
+
+def _analyze(st, text: str, fuzzy: bool = True):
+    """Cleaned, stopword-free query words and their (typo-corrected) stems."""
+    words = [w for w in clean_text_for_query(text).split() if w not in _stopwords]
+    stems = [_stem(st, w) for w in words]
+    if fuzzy:
+        stems = [_correct_term(st, t) for t in stems]
+    return words, stems
+
+
+def correct_query(text: str) -> Optional[str]:
+    """'Did you mean' suggestion: the query words with misspelled ones replaced by the
+    vocabulary term they were expanded to, or None when nothing was corrected."""
+    st = _ensure_loaded()
+    words = [w for w in clean_text_for_query(text).split() if w not in _stopwords]
+    changed = False
+    suggestion = []
+    for w in words:
+        stem = _stem(st, w)
+        fixed = _correct_term(st, stem)
+        if fixed != stem:
+            changed = True
+            suggestion.append(fixed)
+        else:
+            suggestion.append(w)
+    return " ".join(suggestion) if changed else None
+
+
 # ---------------------------------------------------
 # PREPROCESS + BIGRAM
 # ---------------------------------------------------
-def preprocess_query(text: str):
-    text = clean_text_for_query(text)
-    tokens = text.split()
+def preprocess_query(text: str, fuzzy: bool = True):
+    return _preprocess(_ensure_loaded(), text, fuzzy)
+
 
-    tokens = [t for t in tokens if t not in _stopwords]
-    tokens = [_stemmer.stem(t) for t in tokens]
+def _preprocess(st, text: str, fuzzy: bool = True):
+    _, tokens = _analyze(st, text, fuzzy)
 
     # BIGRAMS
     bigrams = []
@@ -100,71 +1043,411 @@ def preprocess_query(text: str):
 
 
 # ---------------------------------------------------
-# HELPER: AND LOGIC - ensure doc contains all query UNIGRAMS (not bigrams)
+# HELPER: AND LOGIC via inverted index (candidate generation)
 # ---------------------------------------------------
-def _doc_contains_all_tokens(doc_tokens: List[str], query_tokens: List[str]) -> bool:
-    """Check if doc_tokens contain ALL unigram tokens from query_tokens (AND matching).
-    Ignores bigrams since documents don't store them as separate tokens."""
-    if not query_tokens:
-        return True
-    doc_set = set(doc_tokens)
-    # Only check unigrams (tokens without space), skip bigrams
-    unigrams = [t for t in query_tokens if ' ' not in t]
+def _candidate_docs(st, query_tokens: List[str], phrase: bool = False) -> List[int]:
+    """Return sorted doc indices (positions in the docs) containing ALL query unigrams
+    (bigrams are not separate doc tokens), by intersecting the postings of the query
+    terms, starting from the shortest list.
+    With phrase=True every query bigram must also occur as adjacent tokens."""
+    unigrams = set(t for t in query_tokens if ' ' not in t)
     if not unigrams:
-        return True
-    return all(token in doc_set for token in unigrams)
+        return list(range(len(st.docs)))
+    candidates = _unigram_candidates(st, unigrams)
+    if phrase and candidates:
+        gaps = _bigram_gaps(st, query_tokens, candidates)
+        if gaps.size:
+            candidates = [i for i, ok in zip(candidates, (gaps == 1).all(axis=0)) if ok]
+    return candidates
+
+
+def _unigram_candidates(st, unigrams) -> List[int]:
+    result = st.inverted.intersect(list(unigrams))
+    return sorted(st.no_to_idx[no] for no in result.tolist() if no in st.no_to_idx)
+
+
+# ---------------------------------------------------
+# HELPER: PHRASES via the positional index
+# ---------------------------------------------------
+def _term_positions(st, j: int, i: int):
+    """Sorted token positions of term id j in doc i (None if the doc lacks the term)."""
+    col = st.bm25_tf.indices[st.bm25_tf.indptr[j]:st.bm25_tf.indptr[j + 1]]
+    p = int(np.searchsorted(col, i))
+    if p == col.size or col[p] != i:
+        return None
+    g = st.bm25_tf.indptr[j] + p
+    return st.pos_data[st.pos_indptr[g]:st.pos_indptr[g + 1]]
+
+
+def _bigram_gaps(st, query_tokens: List[str], rows) -> np.ndarray:
+    """Smallest distance from the first to the second word of every query bigram,
+    per doc in rows: array (n_bigrams, n_rows), 1 = exact phrase, inf = never in order."""
+    bigrams = [t.split(' ') for t in query_tokens if ' ' in t]
+    gaps = np.full((len(bigrams), len(rows)), np.inf)
+    for b, (first, second) in enumerate(bigrams):
+        j1, j2 = st.term_ids.get(first), st.term_ids.get(second)
+        if j1 is None or j2 is None:
+            continue
+        for n, i in enumerate(rows):
+            p1 = _term_positions(st, j1, i)
+            p2 = _term_positions(st, j2, i) if p1 is not None else None
+            if p2 is None:
+                continue
+            nxt = np.searchsorted(p2, p1, side="right")
+            ok = nxt < p2.size
+            if ok.any():
+                gaps[b, n] = (p2[nxt[ok]] - p1[ok]).min()
+    return gaps
+
+
+def _phrase_proximity(st, query_tokens: List[str], rows) -> np.ndarray:
+    """Per doc in rows: mean over the query bigrams of 1 / gap (1 for exact phrases)."""
+    gaps = _bigram_gaps(st, query_tokens, rows)
+    if gaps.size == 0:
+        return np.zeros(len(rows), dtype=np.float64)
+    return (1.0 / gaps).mean(axis=0)
+
+
+# ---------------------------------------------------
+# HELPER: TF-IDF term-at-a-time scoring
+# ---------------------------------------------------
+def _tfidf_scores(st, q_vec, mask: Optional[np.ndarray] = None):
+    """Cosine similarity of the query against the docs, computed term-at-a-time
+    from only the matrix columns of the query terms (and only their postings in mask,
+    filtered before scoring). Returns (doc_ids, scores) for the docs with a non-zero
+    score; doc_ids are sorted doc indices."""
+    q_vec = q_vec.tocsr()
+    q_norm = np.sqrt(np.sum(q_vec.data.astype(np.float64) ** 2))
+    if q_vec.nnz == 0 or q_norm == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+
+    indptr, indices, data = st.tfidf_matrix.indptr, st.tfidf_matrix.indices, st.tfidf_matrix.data
+    rows, vals = [], []
+    for j, w in zip(q_vec.indices, q_vec.data / q_norm):
+        start, end = indptr[j], indptr[j + 1]
+        r, v = indices[start:end], data[start:end]
+        if mask is not None:
+            keep = mask[r]
+            r, v = r[keep], v[keep]
+        rows.append(r)
+        vals.append(v * w)
+    rows = np.concatenate(rows)
+    if rows.size == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+
+    doc_ids, inverse = np.unique(rows, return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate(vals))
+    return doc_ids, scores
+
+
+def _scores_for(doc_ids, scores, rows) -> np.ndarray:
+    """Look up the sparse (doc_ids, scores) accumulator for the given doc indices (0 if absent)."""
+    rows = np.asarray(rows, dtype=np.int64)
+    if doc_ids.size == 0:
+        return np.zeros(rows.shape[0], dtype=np.float64)
+    pos = np.searchsorted(doc_ids, rows)
+    pos[pos == doc_ids.size] = 0
+    return np.where(doc_ids[pos] == rows, scores[pos], 0.0)
+
+
+# ---------------------------------------------------
+# HELPER: CATEGORY BOOSTING
+# ---------------------------------------------------
+def _category_intent(query: str):
+    """Kategori values (lowercased) that the raw query asks to boost."""
+    ql = query.lower()
+    intent = set()
+    if "pakaian" in ql:
+        intent.add("pakaian")
+    if "tarian" in ql or "tari" in ql:
+        intent.add("tarian")
+    if "musik" in ql or "alat musik" in ql:
+        intent.add("alat musik")
+    return frozenset(intent)
+
+
+def _category_mask(st, intent, rows=None) -> np.ndarray:
+    """Boolean mask over all docs (or only `rows`) whose kategori is in the intent."""
+    codes = st.cat_codes if rows is None else st.cat_codes[np.asarray(rows, dtype=np.int64)]
+    wanted = [c for c, kat in enumerate(st.cat_values) if kat in intent]
+    if not wanted:
+        return np.zeros(codes.shape[0], dtype=bool)
+    return np.isin(codes, wanted)
+
+
+# ---------------------------------------------------
+# HELPER: FACETS (kategori / asal_daerah bitmaps)
+# ---------------------------------------------------
+def build_facets(docs):
+    """field -> (sorted distinct values, bool bitmap per value over the doc indices)."""
+    facets = {}
+    for field in FACET_FIELDS:
+        col = [code_value(doc.get(field)) for doc in docs]
+        values = sorted(set(col))
+        codes = {v: k for k, v in enumerate(values)}
+        bits = np.zeros((len(values), len(docs)), dtype=bool)
+        bits[[codes[v] for v in col], np.arange(len(docs))] = True
+        facets[field] = (values, bits)
+    return facets
+
+
+def _ensure_facets(st):
+    if st.facets is None:
+        if FACETS_NPZ.exists():
+            data = np.load(FACETS_NPZ)
+            # only trust the persisted bitmaps if they were built for this dataset
+            if int(data["n_docs"]) == len(st.docs):
+                st.facets = {
+                    field: (data[f"{field}_values"].tolist(),
+                            np.unpackbits(data[f"{field}_bits"], axis=1, count=len(st.docs)).astype(bool))
+                    for field in FACET_FIELDS
+                }
+        if st.facets is None:
+            st.facets = build_facets(st.docs)
+
+
+def facet_mask(**filters) -> Optional[np.ndarray]:
+    """Bool mask over the doc indices matching every given facet value (case-insensitive),
+    e.g. facet_mask(kategori="tarian", asal_daerah="Bali"). None when no filter is set."""
+    return _facet_mask(_ensure_loaded(), **filters)
+
+
+def _facet_mask(st, **filters) -> Optional[np.ndarray]:
+    _ensure_facets(st)
+    mask = None
+    for field, value in filters.items():
+        if not value:
+            continue
+        values, bits = st.facets[field]
+        want = value.strip().lower()
+        rows = [k for k, v in enumerate(values) if v.lower() == want]
+        m = bits[rows].any(axis=0) if rows else np.zeros(len(st.docs), dtype=bool)
+        mask = m if mask is None else mask & m
+    return mask
+
+
+def facet_counts(doc_nos) -> Dict[str, Dict[str, int]]:
+    """Number of the given docs per facet value, most frequent first."""
+    st = _ensure_loaded()
+    _ensure_facets(st)
+    rows = np.array([st.no_to_idx[int(no)] for no in doc_nos if int(no) in st.no_to_idx], dtype=np.int64)
+    counts = {}
+    for field in FACET_FIELDS:
+        values, bits = st.facets[field]
+        n = bits[:, rows].sum(axis=1)
+        # values are sorted, so a stable sort on -count keeps ties alphabetical
+        order = np.argsort(-n, kind="stable")
+        counts[field] = {values[k]: int(n[k]) for k in order if n[k] and values[k]}
+    return counts
+
+
+# ---------------------------------------------------
+# HELPER: TOP-K SELECTION
+# ---------------------------------------------------
+def _top_k(st, rows, scores, top_k: Optional[int] = None):
+    """Return [(doc_index, score), ...] sorted by score desc, ties by doc number.
+    With top_k set, only the k best are selected (np.argpartition, O(n)) before
+    sorting them; otherwise every row is sorted."""
+    rows = np.asarray(rows, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+
+    if top_k is not None and top_k < rows.size:
+        if top_k <= 0:
+            return []
+        part = np.argpartition(-scores, top_k - 1)[:top_k]
+        kth = scores[part].min()
+        above = np.flatnonzero(scores > kth)
+        # scores equal to the k-th one: keep the lowest doc numbers
+        ties = np.flatnonzero(scores == kth)
+        ties = ties[np.argsort(st.doc_nos[rows[ties]], kind="stable")][:top_k - above.size]
+        sel = np.concatenate([above, ties])
+    else:
+        sel = np.arange(rows.size)
+
+    sel = sel[np.lexsort((st.doc_nos[rows[sel]], -scores[sel]))]
+    return list(zip(rows[sel].tolist(), scores[sel].tolist()))
+
+
+def _top_k_boosted(st, rows, scores, boost, top_k: Optional[int] = None):
+    """_top_k ranked on scores + boost (the phrase-proximity boost), returning
+    [(doc_index, score, boost), ...] so the reported score stays unboosted."""
+    rows = np.asarray(rows, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    boost = np.asarray(boost, dtype=np.float64)
+    pos = {i: n for n, i in enumerate(rows.tolist())}
+    return [(i, float(scores[pos[i]]), float(boost[pos[i]]))
+            for i, _ in _top_k(st, rows, scores + boost, top_k)]
+
+
+# ---------------------------------------------------
+# RESULT CACHE
+# ---------------------------------------------------
+def _index_version(models_dir: Path = MODELS_DIR, files=INDEX_FILES):
+    """Name, mtime and size of every file under models/ and of the data_clean/ index
+    files; changes when the index is rebuilt. Build temp files (*.tmp) are skipped."""
+    paths = sorted(models_dir.rglob("*")) if models_dir.exists() else []
+    version = []
+    for p in [*paths, *files]:
+        if p.suffix == ".tmp":
+            continue
+        try:
+            st = p.stat()
+        except FileNotFoundError:  # missing, or replaced during the scan (seen next time)
+            continue
+        if not p.is_dir():
+            version.append((str(p.relative_to(BASE_DIR)), st.st_mtime_ns, st.st_size))
+    return tuple(version)
+
+
+class ResultCache:
+    """Thread-safe LRU cache for search results with optional TTL and hit/miss counters.
+    Everything is dropped when the engine reloads a rebuilt index (check_index); a caller
+    still pinned to the replaced state (snapshot) neither reads nor fills the cache."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: Optional[float] = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = _index_generation
+
+    def get(self, key):
+        """Return (True, value) on a hit, (False, None) on a miss."""
+        generation = _state_generation()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key) if self._sync(generation) else None
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        generation = _state_generation()
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if not self._sync(generation):
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _sync(self, generation: int) -> bool:
+        # called with the lock held: whether entries of this generation are current (a state
+        # replaced by a reload is older than _index_generation even if this cache is idle)
+        latest = max(generation, _index_generation)
+        if latest > self._generation:
+            self._generation = latest
+            self._data.clear()
+        return generation == self._generation
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+
+_result_cache = ResultCache()
+
+
+def cache_info() -> Dict[str, Any]:
+    return _result_cache.info()
+
+
+def _cache_key(mode: str, query: str, q_clean: str, top_k: Optional[int], args=(), kwargs=None):
+    # category boosting looks at the raw query, so its intent is part of the key
+    return (mode, q_clean, _category_intent(query), top_k, tuple(args),
+            tuple(sorted((kwargs or {}).items())))
+
+
+def _cached(mode: str):
+    """Cache a search function on (mode, preprocessed query, category intent, top_k, params)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(query: str, top_k: Optional[int] = None, *args, **kwargs):
+            with snapshot():  # key, lookup and results all from one index version
+                q_clean, _ = preprocess_query(query)
+                key = _cache_key(mode, query, q_clean, top_k, args, kwargs)
+                hit, results = _result_cache.get(key)
+                if not hit:
+                    results = fn(query, top_k, *args, **kwargs)
+                    _result_cache.put(key, results)
+            return list(results)
+        return wrapper
+    return decorator
 
 
 # ---------------------------------------------------
 # TF-IDF SEARCH
 # ---------------------------------------------------
-def search_tfidf(query: str, top_k: Optional[int] = None):
-    _ensure_loaded()
-    q_clean, q_tokens = preprocess_query(query)
+@_cached("tfidf")
+def search_tfidf(query: str, top_k: Optional[int] = None, phrase: bool = False):
+    st = _ensure_loaded()
+    q_clean, q_tokens = _preprocess(st, query)
     
     # Return empty if no query tokens
     if not q_tokens:
         return []
     
-    q_vec = _vectorizer.transform([q_clean])
+    q_vec = st.vectorizer.transform([q_clean])
+    doc_ids, sims = _tfidf_scores(st, q_vec)
+    return _rank_tfidf(st, query, q_tokens, doc_ids, sims, top_k, phrase)
+
 
-    sims = cosine_similarity(q_vec, _tfidf_matrix).flatten()
+def _rank_tfidf(st, query: str, q_tokens: List[str], doc_ids, sims, top_k: Optional[int] = None,
+                phrase: bool = False):
+    """TF-IDF ranking given the query's sparse cosine scores (doc_ids, sims)."""
+    # only the AND candidates can be returned, so only their scores are needed
+    candidates = _candidate_docs(st, q_tokens, phrase)
+    sims_max = sims.max() if sims.size else 0
+    cand_sims = _scores_for(doc_ids, sims, candidates)
 
     # NORMALIZE 0–100
-    if sims.max() > 0:
-        sims_norm = (sims / sims.max()) * 100
+    if sims_max > 0:
+        sims_norm = (cand_sims / sims_max) * 100
     else:
-        sims_norm = sims
+        sims_norm = cand_sims
 
     # CATEGORY BOOSTING
-    ql = query.lower()
-
-    for i, doc in enumerate(_docs):
-        kat = doc.get("kategori", "").lower()
-
-        if "pakaian" in ql and kat == "pakaian":
-            sims_norm[i] += 20
-        if ("tarian" in ql or "tari" in ql) and kat == "tarian":
-            sims_norm[i] += 20
-        if ("musik" in ql or "alat musik" in ql) and kat == "alat musik":
-            sims_norm[i] += 20
+    sims_norm[_category_mask(st, _category_intent(query), candidates)] += 20
 
     # AND LOGIC: keep only documents containing ALL query tokens AND score >= 5
-    results = []
-    for i, doc in enumerate(_docs):
-        if sims_norm[i] >= 5 and _doc_contains_all_tokens(doc.get("tokens", []), q_tokens):
-            results.append((i, sims_norm[i]))
+    keep = sims_norm >= 5
+    kept = np.asarray(candidates, dtype=np.int64)[keep]
 
-    # Sort by score descending
-    results.sort(key=lambda x: x[1], reverse=True)
-    
-    if top_k is not None:
-        results = results[:top_k]
+    # PHRASE BOOSTING (query bigrams found close together in the doc): reorders the
+    # kept docs only, so the proximity never decides which docs are returned; on the
+    # 0-100 scale of the score, returned as its own field
+    boost = 100 * PHRASE_BOOST["tfidf"] * _phrase_proximity(st, q_tokens, kept)
+
+    # Sort by score + boost descending (top_k only selects the k best)
+    results = _top_k_boosted(st, kept, sims_norm[keep], boost, top_k)
 
     # Format output
     formatted = []
-    for i, score in results:
-        doc = _docs[i]
+    for i, score, phrase_boost in results:
+        doc = st.docs[i]
         formatted.append({
             "no": doc.get("no", i),
             "judul": doc.get("judul", ""),
@@ -172,7 +1455,8 @@ def search_tfidf(query: str, top_k: Optional[int] = None):
             "asal_daerah": doc.get("asal_daerah", ""),
             "link": doc.get("link", ""),
             "gambar": doc.get("gambar", ""),
-            "score_tfidf": float(score)
+            "score_tfidf": score,
+            "phrase_boost": phrase_boost
         })
     return formatted
 
@@ -180,67 +1464,122 @@ def search_tfidf(query: str, top_k: Optional[int] = None):
 # ---------------------------------------------------
 # JACCARD
 # ---------------------------------------------------
-def _jaccard_score(qa: List[str], db: List[str]):
-    s1 = set(qa)
-    s2 = set(db)
-    if not s1 and not s2:
-        return 0
-    return len(s1 & s2) / len(s1 | s2)
+def _query_term_ids(st, query_tokens: List[str]):
+    """Sorted unique term ids of the query tokens known to the doc term dictionary,
+    plus the size of the query token set (unknown tokens and bigrams included)."""
+    q_set = set(query_tokens)
+    q_ids = np.array(sorted(st.term_ids[t] for t in q_set if t in st.term_ids), dtype=np.int32)
+    return q_ids, len(q_set)
+
+
+def _jaccard_scores(st, q_ids: np.ndarray, q_size: int, rows=None) -> np.ndarray:
+    """Jaccard |query ∩ doc| / |query ∪ doc| of the query token set against every doc's
+    token set (or only `rows`). The intersection sizes come from one sparse binary
+    matrix-vector product, the unions from the per-doc term counts."""
+    matrix = st.doc_term_matrix if rows is None else st.doc_term_matrix[rows]
+    counts = st.doc_term_counts if rows is None else st.doc_term_counts[rows]
+    q_vec = np.zeros(matrix.shape[1], dtype=np.int32)
+    q_vec[q_ids] = 1
+    inter = matrix @ q_vec
+    union = q_size + counts - inter
+    scores = np.zeros(matrix.shape[0], dtype=np.float64)
+    np.divide(inter, union, out=scores, where=union > 0)
+    return scores
+
+
+def match_docs(query_tokens: List[str], mask: Optional[np.ndarray] = None, phrase: bool = False):
+    """(rows, jaccard) for the docs containing all query unigrams (and, with phrase=True,
+    every query bigram as adjacent tokens): sorted doc positions (restricted to mask if
+    given) and their Jaccard scores against the query."""
+    return _match_docs(_ensure_loaded(), query_tokens, mask, phrase)
+
+
+def _match_docs(st, query_tokens: List[str], mask: Optional[np.ndarray] = None, phrase: bool = False):
+    rows = np.asarray(_candidate_docs(st, query_tokens, phrase), dtype=np.int64)
+    if mask is not None:
+        rows = rows[mask[rows]]
+    q_ids, q_size = _query_term_ids(st, query_tokens)
+    return rows, _jaccard_scores(st, q_ids, q_size, rows)
+
 
+def score_docs(q_clean: str, query_tokens: List[str], mask: Optional[np.ndarray] = None,
+               phrase: bool = False):
+    """match_docs plus the raw TF-IDF cosine of every matched doc: (rows, tfidf, jaccard)."""
+    st = _ensure_loaded()
+    rows, jaccard = _match_docs(st, query_tokens, mask, phrase)
+    doc_ids, sims = _tfidf_scores(st, st.vectorizer.transform([q_clean]), mask)
+    return rows, _scores_for(doc_ids, sims, rows), jaccard
 
-def search_jaccard(query: str, top_k: Optional[int] = None):
-    _ensure_loaded()
-    _, q_tokens = preprocess_query(query)
+
+def phrase_proximity(query_tokens: List[str], rows) -> np.ndarray:
+    """Phrase-proximity of the query bigrams per doc in rows (1 = every bigram occurs as an
+    exact phrase, 0 = none in order), for boosting already thresholded results."""
+    return _phrase_proximity(_ensure_loaded(), query_tokens, np.asarray(rows, dtype=np.int64))
+
+
+def score_docs_many(q_cleans: List[str], query_tokens: List[List[str]],
+                    mask: Optional[np.ndarray] = None, phrase: bool = False):
+    """score_docs for many queries: the TF-IDF cosines of all of them come from one sparse
+    matrix product (_batch_tfidf_scores). Returns one (rows, tfidf, jaccard) per query."""
+    st = _ensure_loaded()
+    if not q_cleans:
+        return []
+    scores = _batch_tfidf_scores(st, st.vectorizer.transform(list(q_cleans)), mask)
+    out = []
+    for n, tokens in enumerate(query_tokens):
+        rows, jaccard = _match_docs(st, tokens, mask, phrase)
+        start, end = scores.indptr[n], scores.indptr[n + 1]
+        doc_ids, sims = scores.indices[start:end].astype(np.int64), scores.data[start:end]
+        out.append((rows, _scores_for(doc_ids, sims, rows), jaccard))
+    return out
+
+
+@_cached("jaccard")
+def search_jaccard(query: str, top_k: Optional[int] = None, phrase: bool = False):
+    st = _ensure_loaded()
+    _, q_tokens = _preprocess(st, query)
 
     # Return empty if no query tokens
     if not q_tokens:
         return []
 
-    scores = []
-    for i, doc in enumerate(_docs):
-        tok = doc.get("tokens", [])
-        
-        # AND LOGIC: only compute score if doc contains ALL tokens
-        if _doc_contains_all_tokens(tok, q_tokens):
-            sc = _jaccard_score(q_tokens, tok)
-            scores.append((i, sc))
+    return _rank_jaccard(st, query, q_tokens, top_k, phrase)
+
+
+def _rank_jaccard(st, query: str, q_tokens: List[str], top_k: Optional[int] = None,
+                  phrase: bool = False):
+    # AND LOGIC: only compute score for docs containing ALL tokens
+    q_ids, q_size = _query_term_ids(st, q_tokens)
+    candidates = _candidate_docs(st, q_tokens, phrase)
 
     # If no docs match AND logic, return empty
-    if not scores:
+    if not candidates:
         return []
 
+    j_scores = _jaccard_scores(st, q_ids, q_size, candidates)
+
     # CATEGORY BOOSTING
-    ql = query.lower()
-    boosted_scores = []
-    
-    for idx_doc, sc in scores:
-        doc = _docs[idx_doc]
-        kat = doc.get("kategori", "").lower()
-
-        if "pakaian" in ql and kat == "pakaian":
-            sc += 0.2
-        if ("tarian" in ql or "tari" in ql) and kat == "tarian":
-            sc += 0.2
-        if ("musik" in ql or "alat musik" in ql) and kat == "alat musik":
-            sc += 0.2
-
-        # Filter by minimum threshold
-        if sc >= 0.1:
-            boosted_scores.append((idx_doc, sc))
-
-    if not boosted_scores:
+    j_scores[_category_mask(st, _category_intent(query), candidates)] += 0.2
+
+    # Filter by minimum threshold
+    keep = j_scores >= 0.1
+    if not keep.any():
         return []
+    kept = np.asarray(candidates, dtype=np.int64)[keep]
 
-    boosted_scores.sort(key=lambda x: x[1], reverse=True)
-    max_j = boosted_scores[0][1]
+    # NORMALIZE 0–100
+    kept_scores = j_scores[keep]
+    max_j = kept_scores.max()
+    scale = 100 / max_j if max_j > 0 else 1
 
-    if top_k is not None:
-        boosted_scores = boosted_scores[:top_k]
+    # PHRASE BOOSTING (after the threshold: only reorders the kept docs), on the scale of
+    # the normalized score, returned as its own field
+    boost = PHRASE_BOOST["jaccard"] * _phrase_proximity(st, q_tokens, kept) * scale
+    ranked = _top_k_boosted(st, kept, kept_scores * scale, boost, top_k)
 
     results = []
-    for i, sc in boosted_scores:
-        doc = _docs[i]
-        sc_norm = (sc / max_j) * 100 if max_j > 0 else sc
+    for i, sc_norm, phrase_boost in ranked:
+        doc = st.docs[i]
         results.append({
             "no": doc.get("no", i),
             "judul": doc.get("judul", ""),
@@ -248,48 +1587,49 @@ def search_jaccard(query: str, top_k: Optional[int] = None):
             "asal_daerah": doc.get("asal_daerah", ""),
             "link": doc.get("link", ""),
             "gambar": doc.get("gambar", ""),
-            "score_jaccard": float(sc_norm)
+            "score_jaccard": sc_norm,
+            "phrase_boost": phrase_boost
         })
     return results
 
 
-def search_hybrid(query: str, top_k: Optional[int] = None, w_tfidf=0.5, w_jaccard=0.5):
-    _ensure_loaded()
+@_cached("hybrid")
+def search_hybrid(query: str, top_k: Optional[int] = None, w_tfidf=0.5, w_jaccard=0.5,
+                  phrase: bool = False):
+    st = _ensure_loaded()
 
-    q_clean, q_tokens = preprocess_query(query)
+    q_clean, q_tokens = _preprocess(st, query)
     
     # Return empty if no query tokens
     if not q_tokens:
         return []
 
-    q_vec = _vectorizer.transform([q_clean])
+    q_vec = st.vectorizer.transform([q_clean])
+    doc_ids, doc_sims = _tfidf_scores(st, q_vec)
+    return _rank_hybrid(st, query, q_tokens, doc_ids, doc_sims, top_k, w_tfidf, w_jaccard, phrase)
+
 
+def _rank_hybrid(st, query: str, q_tokens: List[str], doc_ids, doc_sims, top_k: Optional[int] = None,
+                 w_tfidf=0.5, w_jaccard=0.5, phrase: bool = False):
+    """Hybrid ranking given the query's sparse cosine scores (doc_ids, doc_sims)."""
     # TF-IDF sims
-    sims = cosine_similarity(q_vec, _tfidf_matrix).flatten()
+    sims = np.zeros(len(st.docs), dtype=np.float64)
+    sims[doc_ids] = doc_sims
     sims_norm = (sims / sims.max()) if sims.max() > 0 else sims
 
     # Jaccard sims
-    j_scores = np.array([_jaccard_score(q_tokens, d.get("tokens", [])) for d in _docs])
+    q_ids, q_size = _query_term_ids(st, q_tokens)
+    j_scores = _jaccard_scores(st, q_ids, q_size)
     j_norm = (j_scores / j_scores.max()) if j_scores.max() > 0 else j_scores
 
     # HYBRID (only for docs with AND logic match)
     final = np.zeros_like(sims_norm)
-    for i, doc in enumerate(_docs):
-        if _doc_contains_all_tokens(doc.get("tokens", []), q_tokens):
-            final[i] = (w_tfidf * sims_norm[i]) + (w_jaccard * j_norm[i])
+    for i in _candidate_docs(st, q_tokens, phrase):
+        final[i] = (w_tfidf * sims_norm[i]) + (w_jaccard * j_norm[i])
 
     # CATEGORY BOOSTING – BOOST BEFORE NORMALIZATION
-    ql = query.lower()
-    for i, doc in enumerate(_docs):
-        if final[i] > 0:  # only boost docs that passed AND logic
-            kat = doc.get("kategori", "").lower()
-
-            if "pakaian" in ql and kat == "pakaian":
-                final[i] += 0.3
-            if ("tarian" in ql or "tari" in ql) and kat == "tarian":
-                final[i] += 0.3
-            if ("musik" in ql or "alat musik" in ql) and kat == "alat musik":
-                final[i] += 0.3
+    passed = np.flatnonzero(final > 0)  # only boost docs that passed AND logic
+    final[passed[_category_mask(st, _category_intent(query), passed)]] += 0.3
 
     # NORMALIZE HYBRID 0–100 (only for positive scores)
     pos_idx = np.where(final > 0)[0]
@@ -300,23 +1640,23 @@ def search_hybrid(query: str, top_k: Optional[int] = None, w_tfidf=0.5, w_jaccar
     if final[pos_idx].max() > 0:
         final_norm[pos_idx] = (final[pos_idx] / final[pos_idx].max()) * 100
 
-    # Filter by minimum threshold and sort
-    results_list = []
-    for i in pos_idx:
-        if final_norm[i] >= 5:
-            results_list.append((i, final_norm[i]))
+    # Filter by minimum threshold
+    keep = pos_idx[final_norm[pos_idx] >= 5]
 
-    results_list.sort(key=lambda x: x[1], reverse=True)
+    # PHRASE BOOSTING on the kept docs only, on the 0–100 scale of the normalized score,
+    # returned as its own field
+    boost = (PHRASE_BOOST["hybrid"] * _phrase_proximity(st, q_tokens, keep)
+             * (100 / final[pos_idx].max()))
 
-    if top_k is not None:
-        results_list = results_list[:top_k]
+    # Sort by score + boost
+    results_list = _top_k_boosted(st, keep, final_norm[keep], boost, top_k)
 
     if not results_list:
         return []
 
     results = []
-    for i, final_score in results_list:
-        doc = _docs[i]
+    for i, final_score, phrase_boost in results_list:
+        doc = st.docs[i]
         results.append({
             "no": doc.get("no", i),
             "judul": doc.get("judul", ""),
@@ -326,7 +1666,496 @@ def search_hybrid(query: str, top_k: Optional[int] = None, w_tfidf=0.5, w_jaccar
             "gambar": doc.get("gambar", ""),
             "score_tfidf": float(sims_norm[i] * 100),
             "score_jaccard": float(j_norm[i] * 100),
-            "score_final": float(final_score)
+            "score_final": final_score,
+            "phrase_boost": phrase_boost
         })
 
-    return results
\ No newline at end of file
+    return results
+
+
+# ---------------------------------------------------
+# BM25
+# ---------------------------------------------------
+def _bm25_query_terms(st, q_tokens: List[str]) -> List[int]:
+    """Term ids of the distinct query unigrams known to the index (bigrams have no postings)."""
+    return sorted({st.term_ids[t] for t in q_tokens if ' ' not in t and t in st.term_ids})
+
+
+def _bm25_postings(st, j: int, mask: Optional[np.ndarray] = None):
+    """(doc indices, BM25 contributions) of term id j over its postings (only those in
+    mask, filtered before the contributions are computed)."""
+    start, end = st.bm25_tf.indptr[j], st.bm25_tf.indptr[j + 1]
+    rows = st.bm25_tf.indices[start:end]
+    tf = st.bm25_tf.data[start:end]
+    if mask is not None:
+        keep = mask[rows]
+        rows, tf = rows[keep], tf[keep]
+    tf = tf.astype(np.float64)
+    norm = st.bm25_k1 * (1 - st.bm25_b + st.bm25_b * st.bm25_doc_len[rows] / st.bm25_avgdl)
+    return rows, float(st.bm25_idf[j]) * tf * (st.bm25_k1 + 1) / (tf + norm)
+
+
+def _bm25_scores(st, term_ids: List[int], mask: Optional[np.ndarray] = None):
+    """BM25 over only the postings of the query terms (restricted to the docs in mask).
+    Returns (doc_ids, scores), doc_ids sorted."""
+    if not term_ids:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+    parts = [_bm25_postings(st, j, mask) for j in term_ids]
+    rows = np.concatenate([r for r, _ in parts])
+    doc_ids, inverse = np.unique(rows, return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate([c for _, c in parts]))
+    return doc_ids, scores
+
+
+def _bm25_lookup(st, j: int, doc_ids: np.ndarray):
+    """(hit, contributions) of term id j for the sorted doc_ids: hit marks the docs in its
+    postings, contributions (one per hit) are the values _bm25_postings gives for them."""
+    start, end = st.bm25_tf.indptr[j], st.bm25_tf.indptr[j + 1]
+    rows = st.bm25_tf.indices[start:end]
+    p = np.minimum(np.searchsorted(rows, doc_ids), max(end - start - 1, 0))
+    hit = rows[p] == doc_ids if end > start else np.zeros(doc_ids.size, dtype=bool)
+    g = start + p[hit]
+    tf = st.bm25_tf.data[g].astype(np.float64)
+    norm = st.bm25_k1 * (1 - st.bm25_b + st.bm25_b * st.bm25_doc_len[doc_ids[hit]] / st.bm25_avgdl)
+    return hit, float(st.bm25_idf[j]) * tf * (st.bm25_k1 + 1) / (tf + norm)
+
+
+# relative slack on the MaxScore threshold, so float rounding never prunes a top-k doc
+_MAXSCORE_SLACK = 1e-9
+# below this many postings (summed over the query terms) scoring them all is faster than pruning
+MAXSCORE_MIN_POSTINGS = 2048
+
+
+def _bm25_maxscore(st, term_ids: List[int], top_k: int, mask: Optional[np.ndarray] = None):
+    """MaxScore pruning of _bm25_scores: (doc_ids, scores) of a subset of its docs that holds
+    every doc scoring at least the top_k-th best score, with bit-identical scores.
+
+    Terms are ordered by their upper bound (bm25_max_score). theta, a lower bound of the
+    top_k-th score, starts at the top_k-th contribution of the highest-bound term. The
+    lowest-bound terms whose bounds sum below theta are non-essential (a doc in only their
+    postings cannot reach the top k): the essential postings are scored with NumPy, theta
+    rises to the top_k-th partial score, and only the docs whose partial score plus the
+    non-essential bounds can still reach theta are looked up in the other postings."""
+    bounds = st.bm25_max_score[term_ids]
+    order = np.argsort(bounds, kind="stable")
+    remaining = np.cumsum(bounds[order])
+
+    top = _bm25_postings(st, term_ids[order[-1]], mask)
+    theta = np.partition(top[1], -top_k)[-top_k] if top[1].size >= top_k else 0.0
+    n_skip = int(np.searchsorted(remaining, theta * (1 - _MAXSCORE_SLACK)))
+    if n_skip == 0:
+        return _bm25_scores(st, term_ids, mask)
+
+    parts = [top] + [_bm25_postings(st, term_ids[o], mask) for o in order[n_skip:-1]]
+    rows = np.concatenate([r for r, _ in parts])
+    doc_ids, inverse = np.unique(rows, return_inverse=True)
+    partial = np.bincount(inverse, weights=np.concatenate([c for _, c in parts]))
+    if partial.size >= top_k:
+        theta = max(theta, np.partition(partial, -top_k)[-top_k])
+    doc_ids = doc_ids[partial + remaining[n_skip - 1] >= theta * (1 - _MAXSCORE_SLACK)]
+
+    # exact scores of the survivors, summed in term id order like _bm25_scores
+    scores = np.zeros(doc_ids.size, dtype=np.float64)
+    for j in term_ids:
+        hit, contrib = _bm25_lookup(st, j, doc_ids)
+        scores[hit] += contrib
+    return doc_ids, scores
+
+
+@_cached("bm25")
+def search_bm25(query: str, top_k: Optional[int] = None, kategori: Optional[str] = None,
+                asal_daerah: Optional[str] = None, phrase: bool = False):
+    """BM25 ranking over the inverted index. Unlike the other modes this is not an
+    AND filter: every doc containing at least one query term is ranked.
+    kategori / asal_daerah restrict the postings to that facet before scoring; phrase=True
+    to the docs holding every query bigram as adjacent tokens."""
+    st = _ensure_loaded()
+    _, q_tokens = _preprocess(st, query)
+
+    # Return empty if no query tokens
+    if not q_tokens:
+        return []
+
+    mask = _facet_mask(st, kategori=kategori, asal_daerah=asal_daerah)
+    if phrase and any(' ' in t for t in q_tokens):
+        phrase_mask = np.zeros(len(st.docs), dtype=bool)
+        phrase_mask[_candidate_docs(st, q_tokens, phrase=True)] = True
+        mask = phrase_mask if mask is None else mask & phrase_mask
+    return _rank_bm25(st, q_tokens, top_k, mask)
+
+
+def _rank_bm25(st, q_tokens: List[str], top_k: Optional[int] = None, mask: Optional[np.ndarray] = None):
+    term_ids = _bm25_query_terms(st, q_tokens)
+    indptr = st.bm25_tf.indptr
+    if (top_k and len(term_ids) > 1
+            and sum(int(indptr[j + 1] - indptr[j]) for j in term_ids) >= MAXSCORE_MIN_POSTINGS):
+        # the pruned docs score below the top_k-th, so the max and the head are unchanged
+        doc_ids, scores = _bm25_maxscore(st, term_ids, top_k, mask)
+    else:
+        doc_ids, scores = _bm25_scores(st, term_ids, mask)
+    if doc_ids.size == 0 or scores.max() <= 0:
+        return []
+
+    # NORMALIZE 0–100 and keep score >= 5
+    scores_norm = (scores / scores.max()) * 100
+    keep = scores_norm >= 5
+    ranked = _top_k(st, doc_ids[keep], scores_norm[keep], top_k)
+
+    results = []
+    for i, score in ranked:
+        doc = st.docs[i]
+        results.append({
+            "no": doc.get("no", i),
+            "judul": doc.get("judul", ""),
+            "kategori": doc.get("kategori", ""),
+            "asal_daerah": doc.get("asal_daerah", ""),
+            "link": doc.get("link", ""),
+            "gambar": doc.get("gambar", ""),
+            "score_bm25": float(score)
+        })
+    return results
+
+
+# ---------------------------------------------------
+# BATCH SEARCH
+# ---------------------------------------------------
+_RANKERS = {"tfidf", "jaccard", "hybrid", "bm25"}
+
+
+def _batch_tfidf_scores(st, q_matrix, mask: Optional[np.ndarray] = None):
+    """Cosine scores of many queries at once: one sparse matrix-matrix product
+    of the L2-normalized query rows with the doc matrix (only its rows in mask).
+    Returns a CSR (queries × docs)."""
+    q_matrix = q_matrix.tocsr().astype(np.float64)
+    # every row divided by its norm the same way _tfidf_scores does for a single query,
+    # so a batched cosine equals the per-query one and ties rank the same
+    data = q_matrix.data.copy()
+    for n in range(q_matrix.shape[0]):
+        start, end = q_matrix.indptr[n], q_matrix.indptr[n + 1]
+        norm = np.sqrt(np.sum(q_matrix.data[start:end] ** 2))
+        if norm > 0:
+            data[start:end] = q_matrix.data[start:end] / norm
+    q_matrix = sparse.csr_matrix((data, q_matrix.indices, q_matrix.indptr), shape=q_matrix.shape)
+    if mask is None:
+        scores = (q_matrix @ st.tfidf_matrix.T).tocsr()
+        scores.sort_indices()
+        return scores
+    sel = np.flatnonzero(mask)
+    scores = (q_matrix @ st.tfidf_matrix[sel].T).tocsr()
+    scores.sort_indices()
+    # back from positions in sel to doc indices (sel is sorted, so they stay sorted)
+    return sparse.csr_matrix((scores.data, sel[scores.indices], scores.indptr),
+                             shape=(q_matrix.shape[0], st.tfidf_matrix.shape[0]))
+
+
+def search_many(queries: List[str], mode: str = "hybrid", top_k: Optional[int] = None):
+    """Run many queries in one go (evaluation sets, cache warming, ...).
+    All uncached queries are vectorized together and scored against the TF-IDF matrix
+    with one sparse matrix product. Returns one result list per query, in order,
+    identical to calling search_<mode>(query, top_k) for each."""
+    if mode not in _RANKERS:
+        raise ValueError(f"unknown mode {mode!r}, expected one of {sorted(_RANKERS)}")
+    with snapshot():  # cache lookups and rankings all from one index version
+        return _search_many(_ensure_loaded(), queries, mode, top_k)
+
+
+def _search_many(st, queries: List[str], mode: str, top_k: Optional[int]):
+
+    results = [[] for _ in queries]
+    pending = []
+    for n, query in enumerate(queries):
+        q_clean, q_tokens = _preprocess(st, query)
+        if not q_tokens:
+            continue
+        key = _cache_key(mode, query, q_clean, top_k)
+        hit, cached = _result_cache.get(key)
+        if hit:
+            results[n] = list(cached)
+        else:
+            pending.append((n, query, q_clean, q_tokens, key))
+
+    if not pending:
+        return results
+
+    if mode in ("tfidf", "hybrid"):
+        scores = _batch_tfidf_scores(st, st.vectorizer.transform([p[2] for p in pending]))
+
+    for row, (n, query, q_clean, q_tokens, key) in enumerate(pending):
+        if mode == "jaccard":
+            res = _rank_jaccard(st, query, q_tokens, top_k)
+        elif mode == "bm25":
+            res = _rank_bm25(st, q_tokens, top_k)
+        else:
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            doc_ids, sims = scores.indices[start:end].astype(np.int64), scores.data[start:end]
+            if mode == "tfidf":
+                res = _rank_tfidf(st, query, q_tokens, doc_ids, sims, top_k)
+            else:
+                res = _rank_hybrid(st, query, q_tokens, doc_ids, sims, top_k)
+        _result_cache.put(key, res)
+        results[n] = list(res)
+    return results
+
+
+# ---------------------------------------------------
+# AUTOCOMPLETE
+# ---------------------------------------------------
+def build_suggest(docs, inverted):
+    """Autocomplete arrays: titles (judul) and the terms of inverted (a PostingsIndex),
+    sorted by UTF-8 key, with their document frequency."""
+    entries = {}
+    for doc in docs:
+        title = " ".join(str(doc.get("judul", "")).split())
+        key = title.lower()
+        if not key:
+            continue
+        if key in entries:
+            entries[key][2] += 1
+        else:
+            entries[key] = [0, title, 1]
+    for term in inverted:
+        if term in entries:
+            # a title spelled like a term ("Gamelan"): keep the title label, rank it by
+            # whichever count is higher
+            entries[term][2] = max(entries[term][2], inverted.doc_freq(term))
+        else:
+            entries[term] = [1, term, inverted.doc_freq(term)]
+    keys = sorted(entries, key=lambda k: k.encode("utf-8"))
+    labels = [entries[k][1].encode("utf-8") for k in keys]
+    label_offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in labels], out=label_offsets[1:])
+    return {
+        # format and dataset the entries were built from, checked before a persisted file is used
+        "version": np.int64(SUGGEST_VERSION),
+        "n_docs": np.int64(len(docs)),
+        "n_terms": np.int64(len(inverted)),
+        "keys": np.array([k.encode("utf-8")[:SUGGEST_KEY_BYTES] for k in keys],
+                         dtype=f"S{SUGGEST_KEY_BYTES}"),
+        "kind": np.array([entries[k][0] for k in keys], dtype=np.int8),
+        "df": np.array([entries[k][2] for k in keys], dtype=np.int32),
+        "label_offsets": label_offsets,
+        "label_blob": np.frombuffer(b"".join(labels), dtype=np.uint8),
+    }
+
+
+def _ensure_suggest(st):
+    if st.suggest is None:
+        if SUGGEST_NPZ.exists():
+            data = np.load(SUGGEST_NPZ)
+            # only trust the persisted entries if they were built for this dataset and index
+            if ("version" in data.files and int(data["version"]) == SUGGEST_VERSION
+                    and int(data["n_docs"]) == len(st.docs)
+                    and int(data["n_terms"]) == len(st.inverted)):
+                st.suggest = {name: data[name] for name in data.files}
+        if st.suggest is None:
+            st.suggest = build_suggest(st.docs, st.inverted)
+
+
+def suggest(prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Titles (judul) and vocabulary terms starting with prefix, most documents first
+    (titles before terms on equal counts). Two binary searches over the sorted keys
+    find the range."""
+    st = _ensure_loaded()
+    _ensure_suggest(st)
+    norm = " ".join(prefix.lower().split())
+    if not norm or limit <= 0:
+        return []
+    p = norm.encode("utf-8")[:SUGGEST_KEY_BYTES]
+    keys = st.suggest["keys"]
+    lo = int(np.searchsorted(keys, p, side="left"))
+    if len(p) < SUGGEST_KEY_BYTES:
+        hi = int(np.searchsorted(keys, p + b"\xff", side="left"))  # 0xff never occurs in UTF-8
+    else:
+        # p + 0xff would be truncated back to p; keys with this prefix all equal p
+        hi = int(np.searchsorted(keys, p, side="right"))
+    if lo >= hi:
+        return []
+
+    # most documents first, then titles before terms, then key order: one unique key per
+    # entry, so the partition cannot pick among tied entries arbitrarily
+    rank = -st.suggest["df"][lo:hi].astype(np.int64) * 2 + st.suggest["kind"][lo:hi]
+    key = rank * (hi - lo) + np.arange(hi - lo)
+    # keys are truncated, so over-select a little and re-check the full label below
+    n = min(hi - lo, limit * 2)
+    sel = np.argpartition(key, n - 1)[:n] if n < hi - lo else np.arange(hi - lo)
+    sel = sel[np.argsort(key[sel])]
+
+    offsets, blob = st.suggest["label_offsets"], st.suggest["label_blob"]
+    out = []
+    for s in sel:
+        g = lo + int(s)
+        label = blob[offsets[g]:offsets[g + 1]].tobytes().decode("utf-8")
+        if not label.lower().startswith(norm):
+            continue
+        out.append({
+            "text": label,
+            "type": "judul" if st.suggest["kind"][g] == 0 else "term",
+            "df": int(st.suggest["df"][g]),
+        })
+        if len(out) == limit:
+            break
+    return out
+
+
+# ---------------------------------------------------
+# SNIPPETS (query-dependent, from the token char offsets written by build_index)
+# ---------------------------------------------------
+def _sub_space(pattern, s, idx):
+    # re.sub(pattern, " ", s) that keeps idx (source index of every char of s) aligned
+    out, out_idx, last = [], [], 0
+    for m in re.finditer(pattern, s):
+        out.append(s[last:m.start()] + " ")
+        out_idx.extend(idx[last:m.start()])
+        out_idx.append(idx[m.start()])
+        last = m.end()
+    out.append(s[last:])
+    out_idx.extend(idx[last:])
+    return "".join(out), out_idx
+
+
+def clean_words_with_offsets(text: str):
+    """The words of scripts/preprocessing.py clean_text(text).split(), each with its
+    (start, end) span in text: the same steps, every char carrying its source index."""
+    chars, idx = [], []
+    for i, c in enumerate(text):
+        low = c.lower()
+        chars.append(low)
+        idx.extend([i] * len(low))
+    s = "".join(chars)
+    s, idx = _sub_space(r"http\S+|www\S+|https\S+", s, idx)
+    s, idx = _sub_space(r"\d+", s, idx)
+    s, idx = _sub_space(r"&\w+;", s, idx)
+    keep = [k for k, c in enumerate(s) if c not in string.punctuation]
+    s, idx = "".join(s[k] for k in keep), [idx[k] for k in keep]
+    s, idx = _sub_space(r"[^a-zA-Z\s]", s, idx)
+    return [(m.group(), idx[m.start()], idx[m.end() - 1] + 1) for m in re.finditer(r"\S+", s)]
+
+
+def build_token_offsets(docs):
+    """Char span in doc "teks" of every doc token (the words left after stopword removal;
+    stemming keeps one token per word), as CSR arrays: indptr, start, end."""
+    spans = [[(start, end) for word, start, end in clean_words_with_offsets(str(doc.get("teks", "")))
+              if word not in _stopwords] for doc in docs]
+    indptr = np.zeros(len(spans) + 1, dtype=np.int64)
+    np.cumsum([len(o) for o in spans], out=indptr[1:])
+    flat = np.array([se for o in spans for se in o], dtype=np.int32).reshape(-1, 2)
+    return {"indptr": indptr, "start": flat[:, 0], "end": flat[:, 1]}
+
+
+def _ensure_offsets(st):
+    if st.offsets is None:
+        offsets = None
+        if TOKEN_OFFSETS_FILE.exists():
+            data = np.load(TOKEN_OFFSETS_FILE)
+            offsets = {name: data[name] for name in data.files}
+        # only trust offsets that line up with the indexed token positions
+        if offsets is None or not np.array_equal(np.diff(offsets["indptr"]), st.bm25_doc_len):
+            _log.warning("%s is missing or stale (run scripts/build_index.py), building "
+                         "the snippet offsets from the docs", TOKEN_OFFSETS_FILE.name)
+            # a one-off load of the JSON "teks", freed once the offsets are built
+            offsets = build_token_offsets(st.docs.json_docs())
+            if not np.array_equal(np.diff(offsets["indptr"]), st.bm25_doc_len):
+                _log.warning("doc tokens do not match their teks, snippets are not highlighted")
+                offsets = {}
+        st.offsets = offsets
+
+
+def snippet(doc_no, query_tokens: List[str], max_chars: int = SNIPPET_CHARS) -> Dict[str, Any]:
+    """Window of the doc's deskripsi covering the most query terms, with [start, end)
+    highlight spans into the snippet text. Matches come from the positional index and
+    the stored token offsets, the text itself is never re-tokenized."""
+    st = _ensure_loaded()
+    _ensure_offsets(st)
+    i = st.no_to_idx.get(int(doc_no))
+    if i is None:
+        return {"text": "", "highlights": []}
+    doc = st.docs[i]
+    desc = str(doc.get("deskripsi", ""))
+    # teks = judul + " " + deskripsi + " " + asal_daerah (scripts/preprocessing.py)
+    base = len(str(doc.get("judul", ""))) + 1
+
+    starts = ends = terms = np.zeros(0, dtype=np.int64)
+    if st.offsets:
+        off = st.offsets["indptr"][i]
+        spans = []
+        for w in {w for t in query_tokens for w in t.split(' ')}:
+            j = st.term_ids.get(w)
+            pos = _term_positions(st, j, i) if j is not None else None
+            if pos is not None:
+                spans.append((st.offsets["start"][off + pos], st.offsets["end"][off + pos],
+                              np.full(pos.size, j)))
+        if spans:
+            starts = np.concatenate([s for s, _, _ in spans]).astype(np.int64) - base
+            ends = np.concatenate([e for _, e, _ in spans]).astype(np.int64) - base
+            terms = np.concatenate([t for _, _, t in spans])
+            inside = (starts >= 0) & (ends <= len(desc))
+            order = np.argsort(starts[inside], kind="stable")
+            starts, ends, terms = starts[inside][order], ends[inside][order], terms[inside][order]
+
+    lo = 0
+    if starts.size:
+        # window opening at each match: most distinct query terms, then most matches
+        right = np.searchsorted(ends, starts + max_chars - SNIPPET_LEAD, side="right")
+        best = None
+        for k in range(starts.size):
+            key = (len(set(terms[k:right[k]].tolist())), int(right[k]) - k)
+            if best is None or key > best:
+                best, lo = key, int(starts[k])
+        lo = max(0, lo - SNIPPET_LEAD)
+        if lo > 0:
+            lo = desc.rfind(" ", 0, lo) + 1  # start on a word boundary
+    hi = lo + max_chars
+    if hi < len(desc):
+        cut = desc.rfind(" ", lo, hi)
+        hi = cut if cut > lo else hi
+    else:
+        hi = len(desc)
+
+    return {
+        "text": desc[lo:hi],
+        "highlights": [[int(s) - lo, int(e) - lo] for s, e in zip(starts, ends) if s >= lo and e <= hi],
+    }
+
+
+# ---------------------------------------------------
+# SHARED ENGINE: app.py, evaluation.py and the CLI all read this module's state,
+# so a process loads the documents and indexes once
+# ---------------------------------------------------
+def documents() -> DocStore:
+    """The loaded documents (positions are the doc indices used by match_docs / score_docs)."""
+    return _ensure_loaded().docs
+
+
+def doc_index(doc_no: int) -> Optional[int]:
+    """Position of document `no` in documents(), None if there is no such document."""
+    return _ensure_loaded().no_to_idx.get(int(doc_no))
+
+
+def doc_nos(rows) -> List[int]:
+    """Document numbers of the given doc positions."""
+    return _ensure_loaded().doc_nos[np.asarray(rows, dtype=np.int64)].tolist()
+
+
+def warm_up():
+    """Load every lazily built structure now (indexes, speller, facets, autocomplete,
+    snippet offsets), e.g. in a parent process before forking workers that share them."""
+    st = _ensure_loaded()
+    _ensure_speller(st)
+    _ensure_facets(st)
+    _ensure_suggest(st)
+    _ensure_offsets(st)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Cek hasil pencarian manual: python search_engine.py [mode] ["query"]
+    modes = {"tfidf": search_tfidf, "jaccard": search_jaccard, "hybrid": search_hybrid, "bm25": search_bm25}
+    args = sys.argv[1:]
+    mode = args.pop(0) if args and args[0] in modes else "hybrid"
+    score_key = "score_final" if mode == "hybrid" else f"score_{mode}"
+    queries = [" ".join(args)] if args else iter(lambda: input("query> ").strip(), "")
+    for q in queries:
+        for r in modes[mode](q, 10):
+            print(f"{r['no']:>4}  {r[score_key]:8.3f}  {r['judul']}  ({r['kategori']}, {r['asal_daerah']})")
+        print()
@@ -0,0 +1,91 @@
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import search_engine as se  # noqa: E402
+
+
+def alpha_word(k):
+    """Letters-only word k ("kataaab", ...), survives the digit stripping of query cleaning."""
+    return "kata" + "".join(chr(ord("a") + int(d)) for d in f"{k:03d}")
+
+
+def make_docs(n_docs=300, n_terms=120, seed=0, word=lambda k: f"t{k:03d}"):
+    """Synthetic preprocessed docs: Zipf-like token draws so a few terms have long postings."""
+    rng = random.Random(seed)
+    vocab = [word(k) for k in range(n_terms)]
+    weights = [1 / (k + 1) for k in range(n_terms)]
+    docs = []
+    for i in range(n_docs):
+        tokens = rng.choices(vocab, weights, k=rng.randint(1, 40))
+        docs.append({
+            "no": 1000 + 7 * i,
+            "judul": f"Judul {i % 50}",
+            "kategori": rng.choice(["Tarian", "Alat Musik", "Pakaian"]),
+            "asal_daerah": rng.choice(["Bali", "Aceh", "Papua"]),
+            "tokens": tokens,
+            "clean_text": " ".join(tokens),
+        })
+    return docs
+
+
+@pytest.fixture
+def docs():
+    return make_docs()
+
+
+@pytest.fixture
+def bm25_state(docs):
+    """EngineState with the doc and BM25 structures built in memory from the synthetic docs."""
+    store = se.DocStore.from_docs(docs)
+    term_ids, _, _ = se.build_doc_terms(docs)
+    tf, idf, doc_len, k1, b = se.build_bm25(docs, term_ids)
+    return se.EngineState(
+        docs=store, doc_nos=store.column("no").astype(np.int64), term_ids=term_ids,
+        bm25_tf=tf, bm25_idf=idf, bm25_doc_len=doc_len,
+        bm25_k1=k1, bm25_b=b, bm25_avgdl=doc_len.mean(),
+        bm25_max_score=se.build_bm25_max_score(tf, idf, doc_len, k1, b),
+    )
+
+
+@pytest.fixture
+def engine_state(monkeypatch):
+    """Complete EngineState over letters-only synthetic docs, installed as the current state
+    (with an empty result cache), so the public search functions run on it."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    docs = make_docs(word=alpha_word)
+    store = se.DocStore.from_docs(docs)
+    doc_nos = store.column("no").astype(np.int64)
+    kats = [d["kategori"].lower() for d in docs]
+    cat_values = sorted(set(kats))
+    term_ids, doc_indptr, doc_indices = se.build_doc_terms(docs)
+    tf, idf, doc_len, k1, b = se.build_bm25(docs, term_ids)
+    pos_indptr, pos_data = se.build_positions(docs, term_ids, tf)
+    fitted = TfidfVectorizer(ngram_range=(1, 2)).fit([d["clean_text"] for d in docs])
+    ones = np.ones(doc_indices.shape[0], dtype=np.int32)
+    st = se.EngineState(
+        stem_lexicon={t: t for t in term_ids},  # the words are their own stems
+        docs=store, doc_nos=doc_nos, no_to_idx={no: i for i, no in enumerate(doc_nos.tolist())},
+        cat_values=cat_values,
+        cat_codes=np.array([cat_values.index(k) for k in kats], dtype=np.int8),
+        inverted=se.PostingsIndex.from_postings(se.build_postings(docs)),
+        vectorizer=se.QueryVectorizer(fitted.vocabulary_, fitted.idf_),
+        tfidf_matrix=se.normalize_tfidf(fitted.transform([d["clean_text"] for d in docs])),
+        term_ids=term_ids, doc_indptr=doc_indptr, doc_indices=doc_indices,
+        doc_term_matrix=se.sparse.csr_matrix((ones, doc_indices, doc_indptr),
+                                             shape=(len(docs), len(term_ids))),
+        doc_term_counts=np.diff(doc_indptr),
+        bm25_tf=tf, bm25_idf=idf, bm25_doc_len=doc_len, bm25_k1=k1, bm25_b=b,
+        bm25_avgdl=doc_len.mean(), bm25_max_score=se.build_bm25_max_score(tf, idf, doc_len, k1, b),
+        pos_indptr=pos_indptr, pos_data=pos_data, facets=se.build_facets(store),
+    )
+    monkeypatch.setattr(se, "_state", st)
+    monkeypatch.setattr(se, "_loaded_version", None)
+    monkeypatch.setattr(se, "_result_cache", se.ResultCache())
+    return st
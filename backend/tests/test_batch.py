@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+import search_engine as se
+from conftest import alpha_word
+
+# frequent words (with bigrams and AND matches), a pair of rare words, and a word
+# outside the vocabulary (no matches in any mode)
+QUERIES = [" ".join(alpha_word(k) for k in ks)
+           for ks in [(0, 1), (1, 0), (0, 2), (2, 3), (0, 1, 2), (4, 0), (0,), (37, 41)]] + ["qqqq"]
+
+
+def test_batch_tfidf_scores_match_single_query():
+
+    X = sparse.random(300, 120, density=0.05, format="csr", random_state=1)
+    st = se.EngineState(tfidf_matrix=se.normalize_tfidf(X))
+    Q = sparse.random(40, 120, density=0.04, format="csr", random_state=2)
+    Q = sparse.vstack([Q, sparse.csr_matrix((1, 120))]).tocsr()  # an all-zero query too
+
+    batch = se._batch_tfidf_scores(st, Q)
+    for n in range(Q.shape[0]):
+        doc_ids, scores = se._tfidf_scores(st, Q[n])
+        row = batch[n]
+        keep = row.data != 0
+        np.testing.assert_array_equal(row.indices[keep], doc_ids)
+        np.testing.assert_allclose(row.data[keep], scores, rtol=0, atol=1e-12)
+
+
+def test_tfidf_mask_restricts_postings():
+
+    X = sparse.random(300, 120, density=0.05, format="csr", random_state=1)
+    st = se.EngineState(tfidf_matrix=se.normalize_tfidf(X))
+    Q = sparse.random(20, 120, density=0.04, format="csr", random_state=2)
+    mask = np.random.default_rng(3).random(300) < 0.4
+
+    batch = se._batch_tfidf_scores(st, Q, mask)
+    for n in range(Q.shape[0]):
+        full_ids, full_scores = se._tfidf_scores(st, Q[n])
+        doc_ids, scores = se._tfidf_scores(st, Q[n], mask)
+        assert mask[doc_ids].all()
+        np.testing.assert_array_equal(doc_ids, full_ids[mask[full_ids]])
+        np.testing.assert_array_equal(scores, full_scores[mask[full_ids]])
+        row = batch[n]
+        keep = row.data != 0
+        np.testing.assert_array_equal(row.indices[keep], doc_ids)
+        np.testing.assert_allclose(row.data[keep], scores, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("mode, search, field", [
+    ("tfidf", se.search_tfidf, "score_tfidf"),
+    ("jaccard", se.search_jaccard, "score_jaccard"),
+    ("hybrid", se.search_hybrid, "score_final"),
+    ("bm25", se.search_bm25, "score_bm25"),
+])
+@pytest.mark.parametrize("top_k", [None, 5])
+def test_search_many_matches_single_queries(engine_state, monkeypatch, mode, search, field, top_k):
+    batch = se.search_many(QUERIES, mode, top_k)
+    monkeypatch.setattr(se, "_result_cache", se.ResultCache())  # rank every query again
+    assert not batch[-1]
+    for query, res in zip(QUERIES, batch):
+        single = search(query, top_k)
+        assert [r["no"] for r in res] == [r["no"] for r in single]
+        assert [r[field] for r in res] == pytest.approx([r[field] for r in single], rel=0, abs=1e-9)
+
+
+@pytest.mark.parametrize("mode", ["combined", "tfidf", "jaccard", "bm25"])
+@pytest.mark.parametrize("kategori", [None, "Tarian"])
+def test_rank_many_matches_rank_full(engine_state, monkeypatch, mode, kategori):
+    pytest.importorskip("fastapi")
+    monkeypatch.setattr(se, "warm_up", lambda: None)  # app loads the engine at import
+    import app
+
+    monkeypatch.setattr(app, "SEARCH_CACHE", se.ResultCache())
+    batch = app.rank_many(QUERIES, mode, 5, kategori)
+    monkeypatch.setattr(app, "SEARCH_CACHE", se.ResultCache())
+    monkeypatch.setattr(se, "_result_cache", se.ResultCache())
+    assert not batch[-1][1]
+    for query, (q_tokens, res) in zip(QUERIES, batch):
+        single_tokens, single = app.rank_full(query, mode, 5, kategori)
+        assert q_tokens == single_tokens
+        assert [r["no"] for r in res] == [r["no"] for r in single]
+        for r, s in zip(res, single):
+            assert r.keys() == s.keys()
+            for k in r.keys() - {"no"}:
+                assert r[k] == pytest.approx(s[k], rel=0, abs=1e-9)
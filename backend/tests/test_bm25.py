@@ -0,0 +1,101 @@
+import math
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import search_engine as se
+
+
+def reference_scores(docs, query_terms, k1, b):
+    """Textbook BM25 per doc, one doc at a time."""
+    n = len(docs)
+    avgdl = sum(len(d["tokens"]) for d in docs) / n
+    df = Counter(t for d in docs for t in set(d["tokens"]))
+    scores = {}
+    for i, d in enumerate(docs):
+        counts = Counter(d["tokens"])
+        s = 0.0
+        for t in set(query_terms):
+            if counts[t]:
+                idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+                norm = k1 * (1 - b + b * len(d["tokens"]) / avgdl)
+                s += idf * counts[t] * (k1 + 1) / (counts[t] + norm)
+        if s > 0:
+            scores[i] = s
+    return scores
+
+
+def queries(seed=1, n=40):
+    rng = random.Random(seed)
+    return [[f"t{rng.randrange(120):03d}" for _ in range(rng.randint(1, 5))] for _ in range(n)]
+
+
+def test_scores_match_reference(bm25_state, docs):
+    st = bm25_state
+    for q in queries():
+        doc_ids, scores = se._bm25_scores(st, se._bm25_query_terms(st, q))
+        ref = reference_scores(docs, q, st.bm25_k1, st.bm25_b)
+        assert sorted(ref) == doc_ids.tolist()
+        np.testing.assert_allclose(scores, [ref[i] for i in doc_ids.tolist()], rtol=1e-5)
+
+
+@pytest.mark.parametrize("top_k", [1, 3, 10, 50])
+def test_top_k_is_head_of_full_ranking(bm25_state, top_k, monkeypatch):
+    monkeypatch.setattr(se, "MAXSCORE_MIN_POSTINGS", 0)  # prune every multi-term query
+    st = bm25_state
+    for q in queries():
+        full = se._rank_bm25(st, q)
+        assert se._rank_bm25(st, q, top_k) == full[:top_k]
+
+
+def test_mask_restricts_postings(bm25_state, docs):
+    st = bm25_state
+    mask = np.array([d["kategori"] == "Tarian" for d in docs])
+    for q in queries(seed=2):
+        doc_ids, _ = se._bm25_scores(st, se._bm25_query_terms(st, q), mask)
+        assert mask[doc_ids].all()
+        full_ids, _ = se._bm25_scores(st, se._bm25_query_terms(st, q))
+        assert doc_ids.tolist() == [i for i in full_ids.tolist() if mask[i]]
+
+
+def test_positions_follow_postings(bm25_state, docs):
+    st = bm25_state
+    tf = st.bm25_tf
+    indptr, data = se.build_positions(docs, st.term_ids, tf)
+    assert indptr[-1] == data.size == sum(len(d["tokens"]) for d in docs)
+    for term, j in st.term_ids.items():
+        for g in range(tf.indptr[j], tf.indptr[j + 1]):
+            tokens = docs[tf.indices[g]]["tokens"]
+            expected = [p for p, t in enumerate(tokens) if t == term]
+            assert data[indptr[g]:indptr[g + 1]].tolist() == expected
+
+
+def test_max_score_bounds_every_contribution(bm25_state):
+    st = bm25_state
+    for j in range(len(st.term_ids)):
+        _, contrib = se._bm25_postings(st, j)
+        assert st.bm25_max_score[j] == (contrib.max() if contrib.size else 0)
+
+
+@pytest.mark.parametrize("top_k", [1, 3, 10])
+def test_maxscore_keeps_top_k_with_exact_scores(bm25_state, docs, top_k):
+    st = bm25_state
+    mask = np.array([d["asal_daerah"] != "Bali" for d in docs])
+    pruned = 0
+    for m in (None, mask):
+        for q in queries(seed=3, n=80):
+            term_ids = se._bm25_query_terms(st, q)
+            full_ids, full_scores = se._bm25_scores(st, term_ids, m)
+            doc_ids, scores = se._bm25_maxscore(st, term_ids, top_k, m)
+            # a subset of the docs, scored bit-identically
+            pos = np.searchsorted(full_ids, doc_ids)
+            assert (full_ids[pos] == doc_ids).all()
+            np.testing.assert_array_equal(scores, full_scores[pos])
+            # holding every doc that scores at least the top_k-th score
+            if full_scores.size:
+                kth = np.sort(full_scores)[::-1][min(top_k, full_scores.size) - 1]
+                assert set(full_ids[full_scores >= kth].tolist()) <= set(doc_ids.tolist())
+            pruned += full_ids.size - doc_ids.size
+    assert pruned > 0
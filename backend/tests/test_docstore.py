@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+import search_engine as se
+
+
+def test_code_values_agree_with_facets(docs):
+    docs[0]["asal_daerah"] = " Jawa"
+    docs[1]["asal_daerah"] = "Jawa  "
+    docs[2]["kategori"] = None
+    store = se.DocStore.from_docs(docs)
+    facets = se.build_facets(docs)
+    for field in se.FACET_FIELDS:
+        values, bits = facets[field]
+        for i in range(len(docs)):
+            assert values[bits[:, i].argmax()] == store.value(i, field)
+    assert store.value(0, "asal_daerah") == store.value(1, "asal_daerah") == "Jawa"
+    assert store.value(2, "kategori") == ""
+
+
+def test_unstored_fields_are_not_read_through_the_store(docs, tmp_path, monkeypatch):
+    path = tmp_path / "preprocessed_dataset.json"
+    path.write_text(json.dumps(docs), encoding="utf-8")
+    monkeypatch.setattr(se, "PREPROCESSED_FILE", path)
+    store = se.DocStore(*se.docstore_columns(docs))  # as opened from models/docstore
+    doc = store[0]
+    for field in se.DOCSTORE_SKIP:
+        if field not in docs[0]:
+            continue
+        assert field not in doc and field not in doc.keys()
+        with pytest.raises(KeyError):
+            store.value(0, field)
+        assert doc.get(field) is None
+    # passes over the unstored fields get a fresh load the store does not keep
+    assert store.json_docs()[0]["tokens"] == docs[0]["tokens"]
+    assert store._json_docs is None
@@ -0,0 +1,43 @@
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+import search_engine as se
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+preprocessing = pytest.importorskip("preprocessing")  # needs pandas, tqdm
+
+TEXTS = [
+    "Tari Saman berasal dari Aceh.",
+    "Lihat https://id.wikipedia.org/wiki/Angklung atau www.example.com/x?y=1 untuk info",
+    "Gamelan ke-2 dari 1.000 alat, tahun 1990an",
+    "Sate &amp; lontong &nbsp;khas Madura",
+    "Kain songket (tenun) - motif 'pucuk rebung'!",
+    "Café naïve Straße İstanbul ½ kolintang",
+    "  spasi\tganda\n\nbaris  baru  ",
+    "",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_words_match_clean_text(text):
+    words = se.clean_words_with_offsets(text)
+    assert [w for w, _, _ in words] == preprocessing.clean_text(text).split()
+    for w, start, end in words:
+        # the span holds the word, give or take the chars clean_text drops inside it
+        assert re.sub(r"[^a-z]", "", text[start:end].lower()) == w
+
+
+def test_offsets_follow_doc_tokens():
+    docs = []
+    for text in TEXTS:
+        tokens = [w for w, _, _ in se.clean_words_with_offsets(text) if w not in se._stopwords]
+        docs.append({"teks": text, "tokens": tokens})
+    offsets = se.build_token_offsets(docs)
+    for i, doc in enumerate(docs):
+        lo, hi = offsets["indptr"][i], offsets["indptr"][i + 1]
+        assert hi - lo == len(doc["tokens"])
+        spans = zip(offsets["start"][lo:hi], offsets["end"][lo:hi])
+        assert [re.sub(r"[^a-z]", "", doc["teks"][s:e].lower()) for s, e in spans] == doc["tokens"]
@@ -0,0 +1,76 @@
+import random
+from functools import reduce
+
+import numpy as np
+import pytest
+
+import search_engine as se
+from search_engine import PostingsIndex, build_postings, encode_postings
+
+
+def test_vbyte_round_trip():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        np.arange(300),
+        [127, 128, 16383, 16384, 2**21 - 1, 2**21, 2**35, 2**62],
+        rng.integers(0, 2**40, 1000),
+    ]).astype(np.int64)
+    buf = se._vbyte_encode(values)
+    assert buf.size == se._vbyte_lengths(values).sum()
+    np.testing.assert_array_equal(se._vbyte_decode(buf), values)
+    assert se._vbyte_decode(se._vbyte_encode([])).size == 0
+
+
+def random_postings(n_terms=60, max_doc=5000, seed=0):
+    rng = random.Random(seed)
+    postings = {}
+    for k in range(n_terms):
+        # df from 1 to a few skip blocks, so both decode paths of intersect are used
+        df = rng.choice([1, 2, 5, 63, 64, 65, 129, 400, 1500])
+        docs = sorted(rng.sample(range(max_doc), df))
+        postings[f"term{k}é" if k % 7 == 0 else f"term{k}"] = (docs, [rng.randint(1, 300) for _ in docs])
+    return postings
+
+
+@pytest.mark.parametrize("skip", [4, 64])
+def test_encode_round_trip(skip):
+    postings = random_postings()
+    index = PostingsIndex(encode_postings(postings, skip=skip))
+    assert index.skip == skip
+    assert sorted(index) == sorted(postings, key=lambda t: t.encode("utf-8"))
+    for term, (docs, tfs) in postings.items():
+        got_docs, got_tfs = index.postings(term)
+        np.testing.assert_array_equal(got_docs, docs)
+        np.testing.assert_array_equal(got_tfs, tfs)
+        assert index.doc_freq(term) == len(docs)
+    assert "missing" not in index and index.doc_freq("missing") == 0
+
+
+def test_rejects_corrupt_file():
+    data = encode_postings(random_postings(n_terms=3))
+    with pytest.raises(ValueError):
+        PostingsIndex(data[:-1])
+    with pytest.raises(ValueError):
+        PostingsIndex(b"XXXX" + data[4:])
+
+
+@pytest.mark.parametrize("skip", [4, 64])
+def test_intersect_matches_numpy(skip):
+    postings = random_postings(seed=1)
+    index = PostingsIndex(encode_postings(postings, skip=skip))
+    terms = list(postings)
+    rng = random.Random(2)
+    for _ in range(300):
+        query = rng.sample(terms, rng.randint(1, 4))
+        expected = reduce(np.intersect1d, (np.array(postings[t][0]) for t in query))
+        np.testing.assert_array_equal(index.intersect(query), expected)
+    assert index.intersect(terms[:1] + ["missing"]).size == 0
+    assert index.intersect([]).size == 0
+
+
+def test_build_postings(docs):
+    index = PostingsIndex.from_postings(build_postings(docs))
+    for term in index:
+        nos, tfs = index.postings(term)
+        expected = sorted((d["no"], d["tokens"].count(term)) for d in docs if term in d["tokens"])
+        assert list(zip(nos.tolist(), tfs.tolist())) == expected
@@ -0,0 +1,32 @@
+import pytest
+
+import search_engine as se
+from conftest import alpha_word
+
+# two- and three-word queries over frequent words, so they have bigrams and matches
+QUERIES = [" ".join(alpha_word(k) for k in ks)
+           for ks in [(0, 1), (1, 0), (0, 2), (2, 3), (0, 1, 2), (1, 3), (4, 0), (0, 5)]]
+
+
+@pytest.mark.parametrize("search, field", [
+    (se.search_tfidf, "score_tfidf"),
+    (se.search_jaccard, "score_jaccard"),
+    (se.search_hybrid, "score_final"),
+])
+def test_phrase_boost_reorders_without_changing_scores(engine_state, monkeypatch, search, field):
+    boosted = {q: search(q) for q in QUERIES}
+    monkeypatch.setattr(se, "PHRASE_BOOST", {k: 0.0 for k in se.PHRASE_BOOST})
+    monkeypatch.setattr(se, "_result_cache", se.ResultCache())
+    n_boosted = 0
+    for q in QUERIES:
+        res, plain = boosted[q], search(q)
+        assert res
+        # same docs with the same (unboosted) scores, ranked on score + boost
+        assert {r["no"]: r[field] for r in res} == {r["no"]: r[field] for r in plain}
+        keys = [r[field] + r["phrase_boost"] for r in res]
+        assert keys == sorted(keys, reverse=True)
+        assert all(r["phrase_boost"] == 0 for r in plain)
+        n_boosted += sum(r["phrase_boost"] > 0 for r in res)
+        if field != "score_tfidf":  # (tfidf adds the category boost on top of its 0-100)
+            assert max(r[field] for r in res) == pytest.approx(100)
+    assert n_boosted > 0
@@ -0,0 +1,66 @@
+import threading
+
+
+def test_rebuilt_index_is_reloaded_and_caches_cleared(monkeypatch):
+    import search_engine as se
+
+    version = ["v1"]
+    loads = []
+
+    def load_state(generation=0):
+        loads.append(version[0])
+        return se.EngineState(docs=f"docs@{version[0]}", generation=generation)
+
+    monkeypatch.setattr(se, "_index_version", lambda: version[0])
+    monkeypatch.setattr(se, "_load_state", load_state)
+    monkeypatch.setattr(se, "CACHE_CHECK_EVERY", 0)
+    for name in ("_state", "_loaded_version", "_index_generation", "_checked_at"):
+        monkeypatch.setattr(se, name, getattr(se, name))
+    se._loaded_version = "v1"
+    se._state = se.EngineState(docs="docs@v1", generation=se._index_generation, facets={"stale": True})
+
+    cache = se.ResultCache()
+    cache.put("q", [1])
+    assert cache.get("q") == (True, [1]) and loads == []
+
+    version[0] = "v2"
+    assert cache.get("q") == (False, None)
+    assert loads == ["v2"] and se._state.docs == "docs@v2" and se._state.facets is None
+    assert se._loaded_version == "v2"
+
+    cache.put("q", [2])
+    assert cache.get("q") == (True, [2]) and loads == ["v2"]
+
+
+def test_snapshot_keeps_one_state_across_a_reload(monkeypatch):
+    import search_engine as se
+
+    version = ["v1"]
+
+    def load_state(generation=0):
+        return se.EngineState(docs=f"docs@{version[0]}", generation=generation)
+
+    monkeypatch.setattr(se, "_index_version", lambda: version[0])
+    monkeypatch.setattr(se, "_load_state", load_state)
+    monkeypatch.setattr(se, "CACHE_CHECK_EVERY", 0)
+    for name in ("_state", "_loaded_version", "_index_generation", "_checked_at"):
+        monkeypatch.setattr(se, name, getattr(se, name))
+    se._loaded_version = "v1"
+    se._state = se.EngineState(docs="docs@v1", generation=se._index_generation)
+    cache = se.ResultCache()
+
+    with se.snapshot():
+        assert se.documents() == "docs@v1"
+        version[0] = "v2"
+        # another thread sees the reload, this block keeps reading the state it pinned
+        seen = []
+        t = threading.Thread(target=lambda: seen.append(se.documents()))
+        t.start()
+        t.join()
+        assert seen == ["docs@v2"]
+        assert se.documents() == "docs@v1"
+        # results computed from the replaced state never enter the cache
+        cache.put("q", ["old"])
+        assert cache.get("q") == (False, None)
+    assert se.documents() == "docs@v2"
+    assert cache.get("q") == (False, None)
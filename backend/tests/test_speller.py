@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import search_engine as se
+
+
+@pytest.fixture
+def speller_state(tmp_path, monkeypatch):
+    """Engine state over a small vocabulary with two close spellings of one instrument,
+    "kolintang" in more documents than "kulintang"."""
+    docs = [{"tokens": ["kolintang", "tari", "gamelan"]} for _ in range(3)]
+    docs += [{"tokens": ["kulintang", "kelintingan", "saman"]}]
+    monkeypatch.setattr(se, "SPELLER_NPZ", tmp_path / "speller.npz")
+    inverted = se.PostingsIndex.from_postings(se.build_postings(docs))
+    return se.EngineState(inverted=inverted)
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("kolintang", "kolintang", 0),
+    ("kolintang", "kulintang", 1),   # substitution
+    ("kolintang", "kolintag", 1),    # deletion
+    ("kolintang", "kolintnag", 1),   # transposition counts once
+    ("gamelan", "gamleaan", 2),
+    ("", "abc", 3),
+])
+def test_edit_distance(a, b, expected):
+    assert se._edit_distance(a, b, 3) == expected
+    assert se._edit_distance(b, a, 3) == expected
+
+
+def test_edit_distance_stops_past_the_limit():
+    assert se._edit_distance("kolintang", "gamelan", 2) == 3
+    assert se._edit_distance("tari", "tarian", 1) == 2  # length difference alone
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("kolintang", "kolintang"),   # known terms are kept
+    ("kulintang", "kulintang"),
+    ("kolintan", "kolintang"),
+    ("kolintnag", "kolintang"),
+    ("kolintamg", "kolintang"),   # typo past the indexed prefix
+    ("kelintang", "kolintang"),   # one edit from both spellings: more documents wins
+    ("kulintank", "kulintang"),
+    ("gamelam", "gamelan"),
+    ("xyzxyzxyz", "xyzxyzxyz"),   # nothing close enough
+])
+def test_correct_term(speller_state, term, expected):
+    assert se._correct_term(speller_state, term) == expected
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("tri", "tri"),      # 3 chars: never corrected
+    ("tary", "tari"),    # 4 chars: one edit
+    ("tzrz", "tzrz"),    # ... but not two
+    ("samna", "saman"),  # 5 chars: two edits
+    ("sxmxn", "saman"),
+])
+def test_short_words_get_fewer_edits(speller_state, term, expected):
+    assert se._correct_term(speller_state, term) == expected
+
+
+def test_persisted_speller_is_used_and_stale_one_rebuilt(speller_state):
+    st = speller_state
+    arrays = se.build_speller(st.inverted)
+    np.savez(se.SPELLER_NPZ, **arrays)
+    se._ensure_speller(st)
+    assert st.speller["keys"].size == arrays["keys"].size
+    assert se._correct_term(st, "kolintan") == "kolintang"
+
+    stale = se.build_speller(se.PostingsIndex.from_postings(se.build_postings([{"tokens": ["tari"]}])))
+    np.savez(se.SPELLER_NPZ, **stale)
+    st.speller = None
+    se._ensure_speller(st)
+    assert int(st.speller["n_terms"]) == len(st.inverted)
+    assert se._correct_term(st, "kolintan") == "kolintang"
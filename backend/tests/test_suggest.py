@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import search_engine as se
+
+
+@pytest.fixture
+def suggest_state(docs, monkeypatch):
+    """Engine state whose autocomplete entries come from the synthetic docs, a few of
+    them titled like a frequent term."""
+    for doc in docs[:3]:
+        doc["judul"] = "T000 Raya"
+    st = se.EngineState(docs=docs, inverted=se.PostingsIndex.from_postings(se.build_postings(docs)))
+    monkeypatch.setattr(se, "_state", st)
+    return st
+
+
+def test_ranked_by_doc_frequency_then_titles(suggest_state, docs):
+    for prefix in ["t", "t0", "t00", "t000", "j", "judul 1"]:
+        out = se.suggest(prefix, limit=1000)
+        assert out and all(r["text"].lower().startswith(prefix) for r in out)
+        ranks = [(-r["df"], r["type"] != "judul") for r in out]
+        assert ranks == sorted(ranks)
+    # titles are counted per document, terms by their postings
+    assert {r["text"]: r["df"] for r in se.suggest("judul 1", 100)}["Judul 1"] == \
+        sum(d["judul"] == "Judul 1" for d in docs)
+    # the frequent term outranks the rarer title sharing its prefix
+    assert [(r["text"], r["df"]) for r in se.suggest("t000", 2)] == \
+        [("t000", suggest_state.inverted.doc_freq("t000")), ("T000 Raya", 3)]
+
+
+def test_limit_is_the_head_of_the_full_list(suggest_state):
+    full = se.suggest("t", limit=1000)
+    for limit in [1, 3, 10]:
+        assert se.suggest("t", limit) == full[:limit]
+
+
+def test_stale_file_is_rebuilt(suggest_state, docs, tmp_path, monkeypatch):
+    st = suggest_state
+    stale = se.build_suggest(docs[:10], se.PostingsIndex.from_postings(se.build_postings(docs[:10])))
+    np.savez(tmp_path / "suggest.npz", **stale)
+    monkeypatch.setattr(se, "SUGGEST_NPZ", tmp_path / "suggest.npz")
+    se._ensure_suggest(st)
+    assert int(st.suggest["n_docs"]) == len(docs)
+    assert st.suggest["keys"].size > stale["keys"].size
+
+
+def test_title_spelled_like_a_term_keeps_the_term_count(suggest_state, docs):
+    st = suggest_state
+    for doc in docs[3:5]:
+        doc["judul"] = "T001"
+    st.suggest = None
+    df = st.inverted.doc_freq("t001")
+    assert df > 2
+    top = se.suggest("t00", 3)
+    assert {"text": "T001", "type": "judul", "df": df} in top
+    assert not any(r["text"] == "t001" for r in se.suggest("t001", 100))
+
+
+def test_prefix_longer_than_the_stored_keys(suggest_state, docs):
+    title = "Tari " + "panjang " * 10 + "sekali"
+    docs[5]["judul"] = title
+    suggest_state.suggest = None
+    assert len(title.encode("utf-8")) > se.SUGGEST_KEY_BYTES
+    for n in [se.SUGGEST_KEY_BYTES - 1, se.SUGGEST_KEY_BYTES, se.SUGGEST_KEY_BYTES + 5, len(title)]:
+        assert [r["text"] for r in se.suggest(title[:n])] == [title]
+    assert se.suggest(title + " x") == []
+
+
+def test_ties_keep_key_order(suggest_state, docs):
+    # every title its own: one doc each, so all "judul ..." entries tie on the rank
+    for i, doc in enumerate(docs):
+        doc["judul"] = f"Judul {i:03d}"
+    suggest_state.suggest = None
+    full = se.suggest("judul", limit=1000)
+    assert [r["text"] for r in full] == [f"Judul {i:03d}" for i in range(len(docs))]
+    for limit in range(1, 40):
+        assert se.suggest("judul", limit) == full[:limit]
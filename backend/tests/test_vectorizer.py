@@ -0,0 +1,53 @@
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import search_engine as se
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+build_index = pytest.importorskip("build_index")  # needs scikit-learn
+
+
+@pytest.fixture
+def vectorizers(docs, tmp_path, monkeypatch):
+    """(QueryVectorizer.load(), unpickled TfidfVectorizer) from one build_tfidf run."""
+    for module in (build_index, se):
+        monkeypatch.setattr(module, "TFIDF_VOCAB_FILE", tmp_path / "tfidf_vocab.json")
+        monkeypatch.setattr(module, "TFIDF_IDF_FILE", tmp_path / "tfidf_idf.npy")
+    monkeypatch.setattr(build_index, "TFIDF_MATRIX_NPZ", tmp_path / "tfidf_matrix.npz")
+    monkeypatch.setattr(build_index, "TFIDF_MODEL_PKL", tmp_path / "tfidf_vectorizer.pkl")
+    monkeypatch.setattr(build_index, "MMAP_DIR", tmp_path / "mmap")
+    build_index.build_tfidf(docs)
+    with open(tmp_path / "tfidf_vectorizer.pkl", "rb") as f:
+        fitted = pickle.load(f)
+    return se.QueryVectorizer.load(), fitted
+
+
+QUERIES = [
+    "t000",
+    "t000 t001 t002",
+    "t000 t000 t000 t005",      # repeated terms
+    "t003 t003 t004 t003 t004",  # repeated bigrams too
+    "tidakada t000 kosong",      # unknown terms
+    "tidakada kosong",           # nothing known
+    "",                          # empty query
+    "   ",
+    "T000 T001, t002! a t119",   # case, punctuation, one-char word
+]
+
+
+def test_query_vectors_match_the_fitted_vectorizer(vectorizers):
+    ours, fitted = vectorizers
+    assert ours.vocabulary == fitted.vocabulary_
+    expected = fitted.transform(QUERIES).tocsr()
+    expected.sort_indices()
+    got = ours.transform(QUERIES)
+    assert got.shape == expected.shape
+    np.testing.assert_array_equal(got.indptr, expected.indptr)
+    np.testing.assert_array_equal(got.indices, expected.indices)
+    np.testing.assert_allclose(got.data, expected.data, rtol=1e-12, atol=0)
+    assert got[QUERIES.index("")].nnz == got[QUERIES.index("tidakada kosong")].nnz == 0
+